@@ -14,10 +14,20 @@ class _Messages:
         self.MSG_DOCUMENT_TAB_TITLE = tr_("Document")
         self.MSG_DEFAULT_PARAM_GROUP_NAME = tr_("Main")
         self.MSG_RUNNING_COMMAND = tr_("Running command: ")
+        self.MSG_PROCESSORS_RECOMPUTED = tr_("Processors re-run: ")
+        self.MSG_PROCESSORS_FOLDED = tr_("Folded defaults: ")
+        self.MSG_MEMO_HITS = tr_("Memo hits: ")
         self.MSG_ASK_CANCEL_EXECUTION = tr_("User ask to cancel execution")
         self.MSG_TERMINATING_PROCESS = tr_("Terminating process...")
+        self.MSG_TEARDOWN_TIME = tr_("Processes terminated in: ")
+        self.MSG_PROCESSES_KILLED = tr_("(killed after the grace period)")
         self.MSG_PROCESS_FINISHED = tr_("Process Finished")
         self.MSG_EXIT_CODE = tr_("exit code: ")
+        self.MSG_OUTPUT_LOG_FILE = tr_("Full output: ")
+        self.MSG_OUTPUT_LINES_OMITTED = tr_("lines omitted, full output: ")
+        self.MSG_DIAGNOSTICS_FOUND = tr_("Errors / warnings: ")
+        self.MSG_NO_BUILD_LOG = tr_("No build log found")
+        self.MSG_NO_ERRORS_IN_LOG = tr_("No errors found in the build log: ")
         self.MSG_QUIT_DIALOG_TITLE = tr_("Quit")
         self.MSG_QUIT_CONFIRMATION = tr_(
             "Do you want to save configurations before quitting?"
@@ -45,6 +55,7 @@ class _Messages:
         self.MSG_ACTION_PRINT_MAKE_HELP = tr_("Print Make Help")
         self.MSG_ACTION_GENERATE_CMD = tr_("Generate Command Line")
         self.MSG_ACTION_GENERATE_BUILD_SCRIPT = tr_("Generate Build Script")
+        self.MSG_ACTION_NEXT_ERROR = tr_("Next Error")
         self.MSG_ACTION_ALWAYS_ON_TOP = tr_("Always on Top")
         self.MSG_ACTION_ABOUT = tr_("About")
         self.MSG_ACTION_LICENSE = tr_("License")
@@ -94,6 +105,16 @@ class _Messages:
         self.MSG_LANGUAGE_FIELD = tr_("Language")
         self.MSG_HDPI_MODE_FIELD = tr_("High DPI Mode")
         self.MSG_CONFIRM_EXIT_FIELD = tr_("Confirm Exit")
+        self.MSG_KILL_GRACE_PERIOD_FIELD = tr_("Kill Grace Period (s)")
+        self.MSG_KILL_GRACE_PERIOD_DESCRIPTION = tr_(
+            "Seconds to wait for make and its child processes to exit after cancelling, "
+            "before they are killed"
+        )
+        self.MSG_MEMO_SIZE_FIELD = tr_("Memo Size")
+        self.MSG_MEMO_SIZE_DESCRIPTION = tr_(
+            "Number of pipeline results made only of pure processors to remember, "
+            "0 to disable, takes effect after restarting"
+        )
 
         self.MSG_SAVE_SETTINGS_ERROR = tr_("Failed to save application settings!")
         self.MSG_SETTINGS_SAVED = tr_(
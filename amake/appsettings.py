@@ -1,10 +1,19 @@
 from pyguiadapterlite import JsonSettingsBase
-from pyguiadapterlite.types import LooseChoiceValue, BoolValue2
+from pyguiadapterlite.types import (
+    LooseChoiceValue,
+    BoolValue2,
+    RangedFloatValue,
+    RangedIntValue,
+)
 
 from ._messages import messages
 
 LANGS = ["auto", "en_US", "zh_CN"]
 DEFAULT_LANG = "auto"
+# 取消执行后，等待make及其子进程退出的时长（秒），超时后强制结束
+DEFAULT_KILL_GRACE_PERIOD = 5.0
+# 记忆化的管道结果数量，0表示不记忆化，与ProcessorExecutor的默认值一致
+DEFAULT_MEMO_SIZE = 0
 
 
 class AmakeAppSettings(JsonSettingsBase):
@@ -20,6 +29,23 @@ class AmakeAppSettings(JsonSettingsBase):
     )
     hdpi_mode = BoolValue2(label=_msgs.MSG_HDPI_MODE_FIELD, default_value=False)
     confirm_exit = BoolValue2(label=_msgs.MSG_CONFIRM_EXIT_FIELD, default_value=False)
+    kill_grace_period = RangedFloatValue(
+        label=_msgs.MSG_KILL_GRACE_PERIOD_FIELD,
+        description=_msgs.MSG_KILL_GRACE_PERIOD_DESCRIPTION,
+        default_value=DEFAULT_KILL_GRACE_PERIOD,
+        min_value=0.0,
+        max_value=600.0,
+        step=0.5,
+        decimals=1,
+    )
+    memo_size = RangedIntValue(
+        label=_msgs.MSG_MEMO_SIZE_FIELD,
+        description=_msgs.MSG_MEMO_SIZE_DESCRIPTION,
+        default_value=DEFAULT_MEMO_SIZE,
+        min_value=0,
+        max_value=65536,
+        step=256,
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -0,0 +1,241 @@
+"""
+构建日志及编译器诊断信息的索引
+写入日志的同时解析GCC/Clang格式的诊断信息（file:line:col: error: message），将其所在行在日志中的
+字节偏移写入索引文件（与日志同名，扩展名为.idx，每行一个JSON对象），跳转到第N个错误时只需读取索引，
+再定位到日志中的对应位置，无需重新扫描整个日志
+旧的日志在开始新的构建时被压缩为.gz文件，并只保留最近的若干个
+"""
+
+import dataclasses
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+from typing import BinaryIO, List, Optional, TextIO
+
+LOG_DIR = os.path.join(".amake", "logs")
+LOG_SUFFIX = ".log"
+GZIP_SUFFIX = ".gz"
+INDEX_SUFFIX = ".idx"
+DEFAULT_KEEP_LOGS = 20
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+SEVERITY_NOTE = "note"
+
+_DIAGNOSTIC = re.compile(
+    r"^(?P<file>(?:[A-Za-z]:)?[^:\n]+):(?P<line>\d+):(?:(?P<column>\d+):)?"
+    r" (?P<severity>fatal error|error|warning|note): (?P<message>[^\n]*)$",
+    re.MULTILINE,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Diagnostic(object):
+    # 诊断信息所在行在（未压缩的）日志中的字节偏移
+    offset: int
+    severity: str
+    file: str
+    line: int
+    column: Optional[int]
+    message: str
+
+    def format(self) -> str:
+        location = f"{self.file}:{self.line}"
+        if self.column is not None:
+            location += f":{self.column}"
+        return f"{location}: {self.severity}: {self.message}"
+
+
+def project_log_dir(project_dir: Optional[str] = None) -> str:
+    return os.path.join(project_dir or os.getcwd(), LOG_DIR)
+
+
+def index_file_of(log_file: str) -> str:
+    if log_file.endswith(GZIP_SUFFIX):
+        log_file = log_file[: -len(GZIP_SUFFIX)]
+    return log_file + INDEX_SUFFIX
+
+
+class BuildLog(object):
+    """
+    将输出写入日志文件，同时建立诊断信息的索引，write()须在同一线程中调用
+    只解析完整的行，不完整的行等到下一次写入或关闭时再解析
+    """
+
+    def __init__(self, log_file: str):
+        self._log_file = log_file
+        self._log: Optional[BinaryIO] = None
+        self._index: Optional[TextIO] = None
+        self._offset = 0
+        self._partial = ""
+        self._diagnostics: List[Diagnostic] = []
+
+    @property
+    def log_file(self) -> str:
+        return self._log_file
+
+    @property
+    def diagnostics(self) -> List[Diagnostic]:
+        return list(self._diagnostics)
+
+    def open(self):
+        os.makedirs(os.path.dirname(self._log_file) or ".", exist_ok=True)
+        self._log = open(self._log_file, "wb")
+        self._index = open(index_file_of(self._log_file), "w", encoding="utf-8")
+
+    def write(self, text: str):
+        if not text:
+            return
+        data = text.encode("utf-8")
+        self._log.write(data)
+        text = self._partial + text
+        end = text.rfind("\n") + 1
+        self._partial = text[end:]
+        if end:
+            self._scan(text[:end])
+
+    def close(self):
+        if self._partial:
+            self._scan(self._partial)
+            self._partial = ""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def _scan(self, text: str):
+        # text为从self._offset开始的完整行，只对匹配项计算字节偏移
+        pos = 0
+        offset = self._offset
+        found = False
+        for match in _DIAGNOSTIC.finditer(text):
+            offset += len(text[pos : match.start()].encode("utf-8"))
+            pos = match.start()
+            column = match.group("column")
+            diagnostic = Diagnostic(
+                offset=offset,
+                severity=match.group("severity"),
+                file=match.group("file"),
+                line=int(match.group("line")),
+                column=int(column) if column else None,
+                message=match.group("message"),
+            )
+            self._diagnostics.append(diagnostic)
+            self._index.write(
+                json.dumps(dataclasses.asdict(diagnostic), ensure_ascii=False) + "\n"
+            )
+            found = True
+        self._offset = offset + len(text[pos:].encode("utf-8"))
+        if found:
+            # 构建过程中即可通过索引跳转到已出现的错误
+            self._index.flush()
+
+
+def load_index(log_file: str) -> List[Diagnostic]:
+    """读取日志的诊断信息索引，索引不存在时返回空列表"""
+    diagnostics = []
+    try:
+        with open(index_file_of(log_file), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    diagnostics.append(Diagnostic(**json.loads(line)))
+                except (ValueError, TypeError):
+                    # 构建过程中读取时，最后一行可能尚未写完
+                    continue
+    except OSError:
+        pass
+    return diagnostics
+
+
+def is_error(diagnostic: Diagnostic) -> bool:
+    return diagnostic.severity in (SEVERITY_ERROR, "fatal error")
+
+
+def read_lines_at(log_file: str, offset: int, count: int = 1) -> List[str]:
+    """从日志的offset处开始读取count行，压缩的日志需要解压offset之前的内容，但无需解析"""
+    opener = gzip.open if log_file.endswith(GZIP_SUFFIX) else open
+    lines = []
+    with opener(log_file, "rb") as f:
+        f.seek(offset)
+        for _ in range(count):
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf-8", errors="replace").rstrip("\n"))
+    return lines
+
+
+def list_logs(log_dir: str) -> List[str]:
+    """返回log_dir中的日志（包括压缩的日志），从旧到新排列"""
+    logs = glob.glob(os.path.join(log_dir, "*" + LOG_SUFFIX))
+    logs += glob.glob(os.path.join(log_dir, "*" + LOG_SUFFIX + GZIP_SUFFIX))
+    return sorted(logs, key=lambda p: (_mtime(p), p))
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def latest_log(log_dir: str) -> Optional[str]:
+    logs = list_logs(log_dir)
+    return logs[-1] if logs else None
+
+
+def rotate_logs(log_dir: str, keep: int = DEFAULT_KEEP_LOGS):
+    """压缩log_dir中未压缩的日志，并删除最近的keep个以外的日志及其索引"""
+    _rotate(list_logs(log_dir), keep)
+
+
+def rotate_logs_in_background(
+    log_dir: str, keep: int = DEFAULT_KEEP_LOGS
+) -> Optional[threading.Thread]:
+    """
+    在后台线程中轮换日志，压缩较大的日志时不会推迟新的构建，返回该线程（无需轮换时返回None）
+    须在创建新的日志之前调用，待轮换的日志在调用时确定，不会涉及之后创建的日志
+    """
+    logs = list_logs(log_dir)
+    if not logs:
+        return None
+    thread = threading.Thread(
+        target=_rotate, args=(logs, keep), name="amake-log-rotation", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _rotate(logs: List[str], keep: int):
+    for log_file in logs[:-keep] if keep > 0 else logs:
+        for path in (log_file, index_file_of(log_file)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    for log_file in logs[-keep:] if keep > 0 else []:
+        if log_file.endswith(LOG_SUFFIX):
+            _compress(log_file)
+
+
+def _compress(log_file: str):
+    tmp_file = log_file + GZIP_SUFFIX + ".tmp"
+    try:
+        stat = os.stat(log_file)
+        with open(log_file, "rb") as src, gzip.open(tmp_file, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_file, log_file + GZIP_SUFFIX)
+        # 保留原日志的修改时间，以保持日志的顺序
+        os.utime(log_file + GZIP_SUFFIX, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.remove(log_file)
+    except OSError:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
@@ -2,7 +2,7 @@ import builtins
 import dataclasses
 import json
 from pathlib import Path
-from typing import Union, Optional, Callable, Type
+from typing import Union, Optional, Callable, Type, Any
 
 from .consts import (
     GLOBAL_VARNAME_APPSETTINGS,
@@ -88,6 +88,19 @@ class Serializable(object):
             return obj
 
 
+def strictly_equal(a: Any, b: Any) -> bool:
+    """相等且类型完全相同（包括容器中的各元素），以区分1、1.0、True等相等但类型不同的值"""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(map(strictly_equal, a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(
+            strictly_equal(v, b[k]) for k, v in a.items()
+        )
+    return a == b
+
+
 def default_tr(text: str) -> str:
     return text
 
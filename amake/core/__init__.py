@@ -1,2 +1,10 @@
-from .amake import Amake
 from .cmd import AmakeCommand
+
+
+def __getattr__(name):
+    # Amake依赖GUI，使用时才导入，以免无界面的命令（如amake run）导入GUI相关的模块
+    if name == "Amake":
+        from .amake import Amake
+
+        return Amake
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
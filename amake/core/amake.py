@@ -1,4 +1,4 @@
-import subprocess
+import os
 import time
 import traceback
 from typing import Optional, Any, Dict
@@ -12,10 +12,12 @@ from pyguiadapterlite import (
 )
 
 from .menus import AmakeMenus
-from .cmd import AmakeCommand
+from .cmd import AmakeCommand, ProcessedValueCache
 from .eventhandler import AmakeEventHandler, EventType
+from .outputsink import OutputSink, make_log_file_path
+from .runner import ProcessRunner
 from .widgets import AmakeWidgets
-from .. import processors
+from .. import buildlog, processors
 from .._messages import messages
 from ..appsettings import AmakeAppSettings
 from ..consts import APP_NAME
@@ -38,8 +40,15 @@ class Amake(object):
         self._appsettings = appsettings
 
         self._gui_adapter: Optional[GUIAdapter] = None
+        self._window: Optional[FnExecuteWindow] = None
+        self._output_sink: Optional[OutputSink] = None
 
-        self._processor_executor = self.create_processor_executor()
+        self._processor_executor = self.create_processor_executor(
+            memo_size=self._appsettings.memo_size if self._appsettings else 0
+        )
+        self._schema.precompute_defaults(self._processor_executor)
+        # 多次执行之间共享的处理结果，只重新执行发生变化的变量、选项的处理器
+        self._value_cache = ProcessedValueCache()
 
         self._widgets = AmakeWidgets()
         self._menus_manager = AmakeMenus(
@@ -48,6 +57,8 @@ class Amake(object):
             configurations=self._configurations,
             widgets=self._widgets,
             processor_executor=self._processor_executor,
+            value_cache=self._value_cache,
+            log_dir=self._log_dir,
         )
         self._event_handler = AmakeEventHandler()
         self._event_handler.add_event_callback(
@@ -71,33 +82,104 @@ class Amake(object):
             uprint(f"\033[33m{msg}\033[0m")
 
         _debug_print(self._msgs.MSG_RUNNING_COMMAND + command.to_command_string())
-        _hinted = False
+        # 使用预先计算的默认值处理结果的变量未执行处理器，单独统计
+        total = command.recomputed_count + command.reused_count + command.folded_count
+        _debug_print(
+            self._msgs.MSG_PROCESSORS_RECOMPUTED + f"{command.recomputed_count}/{total}"
+        )
+        if command.folded_count:
+            _debug_print(self._msgs.MSG_PROCESSORS_FOLDED + f"{command.folded_count}")
+        memo_info = self._processor_executor.memo_info()
+        lookups = memo_info.hits + memo_info.misses
+        if lookups:
+            _debug_print(self._msgs.MSG_MEMO_HITS + f"{memo_info.hits}/{lookups}")
+
+        def _on_cancel():
+            _debug_print(self._msgs.MSG_ASK_CANCEL_EXECUTION)
+            _debug_print(self._msgs.MSG_TERMINATING_PROCESS)
 
-        process = subprocess.Popen(
+        log_dir = self._log_dir()
+        # 压缩此前的日志，并删除较早的日志
+        buildlog.rotate_logs_in_background(log_dir)
+        sink = OutputSink(
+            emit=self._emit_output_frame,
+            log_file=make_log_file_path(log_dir),
+            omitted_message=lambda omitted, log_file: (
+                f"... {omitted} {self._msgs.MSG_OUTPUT_LINES_OMITTED}{log_file}\n"
+            ),
+        )
+        self._output_sink = sink
+        try:
+            sink.open()
+        except OSError as e:
+            _debug_print(f"{e}")
+        else:
+            _debug_print(self._msgs.MSG_OUTPUT_LOG_FILE + sink.log_file)
+
+        runner = ProcessRunner(
             command.to_command_list(),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1,
             shell=True,
+            kill_grace_period=self._appsettings.kill_grace_period,
         )
-        while True:
-            if process.poll() is not None:
-                break
-            output = process.stdout.readline()
-            if output:
-                uprint(output, end="")
-            time.sleep(0.01)
-            if is_function_cancelled():
-                if not _hinted:
-                    _debug_print(self._msgs.MSG_ASK_CANCEL_EXECUTION)
-                    _debug_print(self._msgs.MSG_TERMINATING_PROCESS)
-                    _hinted = True
-                process.terminate()
+        try:
+            returncode = runner.run(
+                on_output=sink.write,
+                is_cancelled=is_function_cancelled,
+                on_cancel=_on_cancel,
+                on_poll=sink.poll,
+            )
+        finally:
+            sink.close()
+        if runner.teardown_time is not None:
+            _debug_print(
+                self._msgs.MSG_TEARDOWN_TIME
+                + f"{runner.teardown_time:.2f}s"
+                + (f" {self._msgs.MSG_PROCESSES_KILLED}" if runner.killed else "")
+            )
         _debug_print(self._msgs.MSG_PROCESS_FINISHED)
-        _debug_print(self._msgs.MSG_EXIT_CODE + str(process.returncode))
+        _debug_print(self._msgs.MSG_EXIT_CODE + str(returncode))
+        diagnostics = sink.diagnostics
+        if diagnostics:
+            errors = sum(1 for d in diagnostics if buildlog.is_error(d))
+            _debug_print(
+                self._msgs.MSG_DIAGNOSTICS_FOUND
+                + f"{errors} / {len(diagnostics) - errors}"
+            )
+
+    def _log_dir(self) -> str:
+        # 完整的输出保存在项目目录（即配置文件所在目录）下的.amake/logs中
+        config_file = self._configurations.filepath
+        project_dir = (
+            os.path.dirname(os.path.abspath(config_file))
+            if config_file
+            else os.getcwd()
+        )
+        return buildlog.project_log_dir(project_dir)
+
+    def _emit_output_frame(self, text: str, replace: bool):
+        window = self._window
+        sink = self._output_sink
+        if window is None:
+            uprint(text, end="")
+            sink.frame_done()
+            return
+        # 在GUI线程中显示一帧，显示完成后才允许输出下一帧
+        window.parent.after(0, self._show_output_frame, window, sink, text, replace)
+
+    @staticmethod
+    def _show_output_frame(
+        window: FnExecuteWindow, sink: OutputSink, text: str, replace: bool
+    ):
+        try:
+            if replace:
+                window.output_view.set_text(text)
+            else:
+                window.output_view.write(text)
+        finally:
+            sink.frame_done()
 
     def after_window_create(self, window: FnExecuteWindow):
+        self._window = window
         self._widgets.create(window)
         self._widgets.set_targets(self._schema.targets)
 
@@ -137,6 +219,7 @@ class Amake(object):
                 schema=self._schema,
                 configurations=self._configurations,
                 processor_executor=self._processor_executor,
+                value_cache=self._value_cache,
             )
         except Exception as e:
             traceback.print_exc()
@@ -204,9 +287,5 @@ class Amake(object):
         self._gui_adapter = None
 
     @staticmethod
-    def create_processor_executor() -> ProcessorExecutor:
-        executor = ProcessorExecutor()
-        builtin_processors = processors.get_builtins()
-        for processor_name, processor_func in builtin_processors.items():
-            executor.register(func=processor_func, name=processor_name)
-        return executor
+    def create_processor_executor(**kwargs) -> ProcessorExecutor:
+        return processors.create_processor_executor(**kwargs)
@@ -1,17 +1,53 @@
+import copy
 import shlex
-from typing import List, Dict
+from typing import List, Dict, Any, Optional, Tuple
 
+from ..common import strictly_equal
 from ..makeoptions import MAKE_OPT_MAKE_BIN_KEY, MAKE_OPT_OVERRIDE_KEY, MakeOptions
 from ..processor import ProcessorExecutor
 from ..schema import AmakeConfigurations, AmakeSchema
 
 
+class ProcessedValueCache(object):
+    """
+    保存每个变量、选项最近一次的处理器、输入值及处理结果，在多次构建AmakeCommand之间共享，
+    处理器及输入值均未改变时，直接复用上次的结果，执行器的注册表变化后全部失效
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[str, Any, Any]] = {}
+        self._registry_generation = -1
+
+    def validate(self, executor: ProcessorExecutor):
+        if executor.registry_generation != self._registry_generation:
+            self._entries.clear()
+            self._registry_generation = executor.registry_generation
+
+    def lookup(
+        self, key: Tuple[str, str], processor: str, value: Any
+    ) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        cached_processor, cached_value, cached_result = entry
+        if cached_processor != processor or not strictly_equal(cached_value, value):
+            return False, None
+        return True, copy.deepcopy(cached_result)
+
+    def store(self, key: Tuple[str, str], processor: str, value: Any, result: Any):
+        self._entries[key] = (processor, copy.deepcopy(value), copy.deepcopy(result))
+
+    def clear(self):
+        self._entries.clear()
+
+
 class AmakeCommand(object):
     def __init__(
         self,
         configurations: AmakeConfigurations,
         schema: AmakeSchema,
         processor_executor: ProcessorExecutor,
+        value_cache: Optional[ProcessedValueCache] = None,
     ):
         self._make_target = ""
         self._user_variables = {}
@@ -21,6 +57,11 @@ class AmakeCommand(object):
 
         self._processor_executor = processor_executor
         self._schema = schema
+        # 传入value_cache时，只重新执行处理器或输入值发生变化的管道
+        self._value_cache = value_cache
+        self._recomputed_count = 0
+        self._reused_count = 0
+        self._folded_count = 0
 
         self.process(configurations)
 
@@ -44,20 +85,97 @@ class AmakeCommand(object):
     def override_variables(self) -> bool:
         return self._override_variables
 
+    @property
+    def recomputed_count(self) -> int:
+        """上一次process()中实际执行的管道数量"""
+        return self._recomputed_count
+
+    @property
+    def reused_count(self) -> int:
+        """上一次process()中从value_cache复用结果的管道数量"""
+        return self._reused_count
+
+    @property
+    def folded_count(self) -> int:
+        """上一次process()中直接使用预先计算的默认值处理结果、未执行的管道数量"""
+        return self._folded_count
+
     def process(self, configurations: AmakeConfigurations):
+        self._recomputed_count = 0
+        self._reused_count = 0
+        self._folded_count = 0
+        if self._value_cache is not None:
+            self._value_cache.validate(self._processor_executor)
         self._process_make_options(configurations)
         self._process_user_variables(configurations)
         self._make_target = configurations.target
 
+    def _lookup(
+        self, key: Tuple[str, str], processor: str, value: Any
+    ) -> Tuple[bool, Any]:
+        if self._value_cache is None or not processor:
+            return False, None
+        hit, result = self._value_cache.lookup(key, processor, value)
+        if hit:
+            self._reused_count += 1
+        return hit, result
+
+    def _store(
+        self,
+        key: Tuple[str, str],
+        processor: str,
+        value: Any,
+        result: Any,
+        folded: bool = False,
+    ):
+        if not processor:
+            return
+        if folded:
+            self._folded_count += 1
+        else:
+            self._recomputed_count += 1
+        # 依赖外部状态的管道每次都需要重新执行，不保存其结果
+        if self._value_cache is not None and self._processor_executor.is_pure(
+            processor
+        ):
+            self._value_cache.store(key, processor, value, result)
+
     def _process_user_variables(self, configurations: AmakeConfigurations):
         user_variables = configurations.variables.copy()
+        reused = {}
+        stale = {}
         for var_name, var_value in user_variables.items():
             processor = self._schema.processor_of(var_name)
-            if not processor:
-                self._user_variables[var_name] = var_value
-                continue
-            processed = self._processor_executor.execute(processor, var_value)
-            self._user_variables[var_name] = processed
+            hit, result = self._lookup(("variable", var_name), processor, var_value)
+            if hit:
+                reused[var_name] = result
+            else:
+                stale[var_name] = var_value
+        # 被引用的变量需要重新处理时，引用它的变量也需要重新处理
+        for var_name in self._schema.dependents_of(stale):
+            if var_name in reused:
+                del reused[var_name]
+                self._reused_count -= 1
+                stale[var_name] = user_variables[var_name]
+
+        folded = set()
+        processed = self._schema.get_processed_values(
+            self._processor_executor, stale, resolved=reused, folded_names=folded
+        )
+        for var_name, result in processed.items():
+            processor = self._schema.processor_of(var_name)
+            self._store(
+                ("variable", var_name),
+                processor,
+                stale[var_name],
+                result,
+                folded=var_name in folded,
+            )
+
+        self._user_variables = {
+            var_name: reused[var_name] if var_name in reused else processed[var_name]
+            for var_name in user_variables
+        }
 
     def _process_make_options(self, configurations: AmakeConfigurations):
         make_options = configurations.options.copy()
@@ -71,7 +189,10 @@ class AmakeCommand(object):
             if not processor:
                 self._make_options[opt_name] = opt_value
                 continue
-            processed = self._processor_executor.execute(processor, opt_value)
+            hit, processed = self._lookup(("option", opt_name), processor, opt_value)
+            if not hit:
+                processed = self._processor_executor.execute(processor, opt_value)
+                self._store(("option", opt_name), processor, opt_value, processed)
             self._make_options[opt_name] = processed
 
     def to_command_list(self) -> List[str]:
@@ -4,7 +4,7 @@ import sys
 import traceback
 import webbrowser
 from functools import partial
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from pyguiadapterlite import (
     FnExecuteWindow,
@@ -16,9 +16,9 @@ from pyguiadapterlite import (
 from pyguiadapterlite.components.textview import SimpleTextViewer
 
 from ._aboutdlg import AboutDialog, AboutSchemaDialog
-from .cmd import AmakeCommand
+from .cmd import AmakeCommand, ProcessedValueCache
 from .widgets import AmakeWidgets
-from .. import assets
+from .. import assets, buildlog
 from .._messages import messages
 from ..appsettings import AmakeAppSettings
 from ..consts import APP_SETTINGS_FILE
@@ -31,6 +31,8 @@ ACTION_ID_EDIT_APPSETTINGS = "edit_app_configs"
 ACTION_ID_RESET_APP_CONFIGS = "reset_app_configs"
 
 AMAKE_LICENSE_FILE = "LICENSE"
+# 跳转到错误时，显示错误所在行及其后的若干行
+ERROR_CONTEXT_LINES = 8
 
 
 def _run_cmd_simple(
@@ -76,6 +78,8 @@ class AmakeMenus(object):
         configurations: AmakeConfigurations,
         widgets: AmakeWidgets,
         processor_executor: ProcessorExecutor,
+        value_cache: Optional[ProcessedValueCache] = None,
+        log_dir: Optional[Callable[[], str]] = None,
     ):
 
         self._msgs = messages()
@@ -92,6 +96,11 @@ class AmakeMenus(object):
         self._configurations = configurations
         self._widgets = widgets
         self._processor_executor = processor_executor
+        self._value_cache = value_cache
+        self._log_dir = log_dir or buildlog.project_log_dir
+        # 上一次跳转到的错误所在日志的索引文件及错误的序号
+        self._error_log: Optional[str] = None
+        self._error_cursor = -1
 
         self._menus = []
 
@@ -109,6 +118,7 @@ class AmakeMenus(object):
         tools_actions = [
             Action(self._msgs.MSG_ACTION_TEST_MAKE_CMD, self.test_make_command),
             Action(self._msgs.MSG_ACTION_PRINT_MAKE_HELP, self.print_make_help),
+            Action(self._msgs.MSG_ACTION_NEXT_ERROR, self.goto_next_error),
             MenuSeparator(),
             Action(self._msgs.MSG_ACTION_GENERATE_CMD, self.generate_command_line),
             Action(
@@ -203,6 +213,35 @@ class AmakeMenus(object):
             cmd, window, print_cmdline=True, show_error=True, print_output=True
         )
 
+    def goto_next_error(self, window: FnExecuteWindow, action: Action):
+        window.show_output_tab()
+        log_file = buildlog.latest_log(self._log_dir())
+        if not log_file:
+            window.print(self._msgs.MSG_NO_BUILD_LOG)
+            return
+        # 日志被压缩后索引文件不变，以索引文件判断是否为同一次构建的日志
+        if buildlog.index_file_of(log_file) != self._error_log:
+            self._error_log = buildlog.index_file_of(log_file)
+            self._error_cursor = -1
+        # 只读取索引，构建过程中也可以跳转到已出现的错误
+        errors = [d for d in buildlog.load_index(log_file) if buildlog.is_error(d)]
+        if not errors:
+            window.print(self._msgs.MSG_NO_ERRORS_IN_LOG + log_file)
+            return
+        self._error_cursor = (self._error_cursor + 1) % len(errors)
+        error = errors[self._error_cursor]
+        window.print()
+        window.print(f"[{self._error_cursor + 1}/{len(errors)}] {log_file}")
+        try:
+            lines = buildlog.read_lines_at(log_file, error.offset, ERROR_CONTEXT_LINES)
+        except OSError as e:
+            window.print(error.format())
+            window.print(str(e))
+            return
+        for line in lines:
+            window.print(line)
+        window.print("=" * 80)
+
     @staticmethod
     def quit(window: FnExecuteWindow, action: Action):
         window.close()
@@ -277,6 +316,7 @@ class AmakeMenus(object):
                 schema=self._schema,
                 configurations=self._configurations,
                 processor_executor=self._processor_executor,
+                value_cache=self._value_cache,
             )
             window.print(
                 self._msgs.MSG_MAKE_CMD.ljust(12), ":", cmd.to_command_string()
@@ -327,6 +367,7 @@ class AmakeMenus(object):
                 schema=self._schema,
                 configurations=self._configurations,
                 processor_executor=self._processor_executor,
+                value_cache=self._value_cache,
             )
             script = cmd.to_command_string()
             filepath = window.select_save_file(
@@ -0,0 +1,172 @@
+"""
+面向GUI控制台的输出汇聚器，不依赖GUI
+将输出合并为帧（每隔一段时间或累积一定大小时输出一次），上一帧尚未显示完成时继续累积而不输出新的帧，
+以免大量输出阻塞GUI的事件循环；控制台中只保留最近的若干行，完整的输出写入日志文件，并为其中的诊断信息建立索引
+"""
+
+import collections
+import os
+import threading
+import time
+from typing import Callable, Deque, List, Optional
+
+from ..buildlog import BuildLog, Diagnostic
+
+DEFAULT_FRAME_INTERVAL = 0.05
+DEFAULT_FRAME_BYTES = 64 * 1024
+DEFAULT_MAX_LINES = 5000
+# 上一帧尚未显示完成时，最多累积的字符数，超出时丢弃累积的内容，下一帧改为替换控制台的内容
+DEFAULT_MAX_PENDING = 16 * DEFAULT_FRAME_BYTES
+
+
+class OutputSink(object):
+    """
+    emit(text, replace)负责显示一帧，replace为True时表示以text替换控制台中的全部内容，
+    帧显示完成后（通常在GUI线程中）须调用frame_done()，在此之前不会输出新的帧
+    write()、poll()、close()须在同一线程中调用
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str, bool], None],
+        log_file: Optional[str] = None,
+        frame_interval: float = DEFAULT_FRAME_INTERVAL,
+        frame_bytes: int = DEFAULT_FRAME_BYTES,
+        max_lines: int = DEFAULT_MAX_LINES,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        omitted_message: Callable[[int, Optional[str]], str] = None,
+    ):
+        self._emit = emit
+        self._log_file = log_file
+        self._log: Optional[BuildLog] = None
+        self._frame_interval = frame_interval
+        self._frame_bytes = frame_bytes
+        self._max_lines = max_lines
+        self._max_pending = max_pending
+        self._omitted_message = omitted_message or _default_omitted_message
+        # 最近的max_lines行，控制台中的内容过多时，以此替换控制台的内容
+        self._recent: Deque[str] = collections.deque(maxlen=max_lines)
+        self._partial = ""
+        self._buffer = []
+        self._buffer_size = 0
+        self._buffer_lines = 0
+        self._visible_lines = 0
+        self._force_replace = False
+        self._total_lines = 0
+        self._last_emit = 0.0
+        self._frame_idle = threading.Event()
+        self._frame_idle.set()
+        self._closed = False
+
+    @property
+    def log_file(self) -> Optional[str]:
+        return self._log_file
+
+    @property
+    def diagnostics(self) -> List[Diagnostic]:
+        return self._log.diagnostics if self._log is not None else []
+
+    @property
+    def total_lines(self) -> int:
+        return self._total_lines
+
+    def recent_lines(self) -> list:
+        lines = list(self._recent)
+        if self._partial:
+            lines.append(self._partial)
+        return lines
+
+    def open(self):
+        if self._log_file and self._log is None:
+            self._log = BuildLog(self._log_file)
+            self._log.open()
+
+    def write(self, text: str):
+        if not text:
+            return
+        if self._log is not None:
+            self._log.write(text)
+        self._remember(text)
+        self._buffer.append(text)
+        self._buffer_size += len(text)
+        self._buffer_lines += text.count("\n")
+        if self._buffer_size > self._max_pending and not self._frame_idle.is_set():
+            # GUI来不及显示时不再累积，其内容已保存在日志及最近的行中
+            self._buffer = [""]
+            self._buffer_size = 0
+            self._buffer_lines = 0
+            self._force_replace = True
+        self.poll()
+
+    def poll(self):
+        """到达帧的间隔或累积的输出足够多，且上一帧已显示完成时，输出一帧"""
+        if not self._buffer or not self._frame_idle.is_set():
+            return
+        if (
+            self._buffer_size < self._frame_bytes
+            and time.monotonic() - self._last_emit < self._frame_interval
+        ):
+            return
+        self._emit_frame()
+
+    def frame_done(self):
+        self._frame_idle.set()
+
+    def close(self, timeout: float = 1.0):
+        """输出剩余的内容并关闭日志文件，最后一帧不等待上一帧显示完成（最多等待timeout秒）"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._buffer:
+            self._frame_idle.wait(timeout)
+            self._emit_frame()
+        if self._log is not None:
+            # 关闭后仍保留，以便读取诊断信息
+            self._log.close()
+
+    def _remember(self, text: str):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        self._recent.extend(lines)
+        self._total_lines += len(lines)
+
+    def _emit_frame(self):
+        text = "".join(self._buffer)
+        lines = self._buffer_lines
+        self._buffer = []
+        self._buffer_size = 0
+        self._buffer_lines = 0
+
+        replace = False
+        if self._force_replace or self._visible_lines + lines > 2 * self._max_lines:
+            # 控制台中的行数超过上限的两倍时，以最近的max_lines行替换全部内容，
+            # 使得控制台的行数保持在上限附近，且替换的开销被分摊到其间输出的各行上
+            omitted = self._total_lines - len(self._recent)
+            text = "".join(line + "\n" for line in self._recent) + self._partial
+            if omitted > 0:
+                # GUI来不及显示而强制替换时，最近的行中可能还没有被丢弃的行
+                text = self._omitted_message(omitted, self._log_file) + text
+            lines = len(self._recent)
+            replace = True
+            self._force_replace = False
+        self._visible_lines = lines if replace else self._visible_lines + lines
+        self._last_emit = time.monotonic()
+        self._frame_idle.clear()
+        self._emit(text, replace)
+
+
+def _default_omitted_message(omitted: int, log_file: Optional[str]) -> str:
+    if log_file:
+        return f"... {omitted} lines omitted, see {log_file}\n"
+    return f"... {omitted} lines omitted\n"
+
+
+def make_log_file_path(log_dir: str, prefix: str = "make") -> str:
+    """在log_dir下生成以时间命名的日志文件路径"""
+    name = time.strftime(f"{prefix}-%Y%m%d-%H%M%S", time.localtime())
+    path = os.path.join(log_dir, name + ".log")
+    i = 1
+    while os.path.exists(path):
+        path = os.path.join(log_dir, f"{name}-{i}.log")
+        i += 1
+    return path
@@ -0,0 +1,292 @@
+"""
+运行外部命令并转发其输出，不依赖GUI
+后台线程以大块的方式读取子进程的输出，只将完整的行交给调用者，调用者所在的线程每次取出全部已到达的输出，
+合并为一次回调，进程结束后，管道中剩余的输出（包括不以换行结尾的最后一行）保证会被转发；
+进程已退出但其后台子进程仍持有输出管道时，只等待到没有新的输出为止，不等待子进程退出
+进程在新的进程组（会话）中运行，取消时结束整个进程组，而不只是shell，宽限期内未退出时强制结束
+"""
+
+import codecs
+import io
+import locale
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional, Union
+
+# 每次从管道读取的最大字节数
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# 等待输出时检查取消请求的间隔（秒）
+POLL_INTERVAL = 0.05
+# 尚未转发的输出块的数量上限，达到上限时读取线程暂停读取，管道写满后子进程随之阻塞，
+# 以免转发的速度跟不上时无限占用内存
+DEFAULT_MAX_PENDING_CHUNKS = 256
+# 取消后等待进程组退出的默认宽限期（秒），超时后强制结束整个进程组
+DEFAULT_KILL_GRACE_PERIOD = 5.0
+# 进程退出后，超过此时长（秒）没有新的输出时不再等待管道关闭，
+# 以免继承了输出管道的后台进程（如make启动的守护进程）使运行一直无法结束
+EXIT_DRAIN_TIMEOUT = 0.5
+
+_IS_WINDOWS = os.name == "nt"
+
+_EOF = object()
+
+
+class ProcessRunner(object):
+    def __init__(
+        self,
+        cmd: Union[List[str], str],
+        shell: bool = False,
+        cwd: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        encoding: Optional[str] = None,
+        max_pending_chunks: int = DEFAULT_MAX_PENDING_CHUNKS,
+        kill_grace_period: float = DEFAULT_KILL_GRACE_PERIOD,
+    ):
+        self._cmd = cmd
+        self._shell = shell
+        self._cwd = cwd
+        self._chunk_size = chunk_size
+        # 与universal_newlines=True时subprocess使用的编码一致
+        self._encoding = encoding or locale.getpreferredencoding(False)
+        self._process: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending_chunks)
+        self._kill_grace_period = max(0.0, kill_grace_period)
+        self._cancelled_at: Optional[float] = None
+        self._killed = False
+        self._teardown_time: Optional[float] = None
+        # 设置后读取线程丢弃读到的输出，不再放入队列
+        self._abandoned = threading.Event()
+
+    @property
+    def process(self) -> Optional[subprocess.Popen]:
+        return self._process
+
+    @property
+    def killed(self) -> bool:
+        """取消后是否因宽限期内未退出而被强制结束"""
+        return self._killed
+
+    @property
+    def teardown_time(self) -> Optional[float]:
+        """从取消到进程组全部退出所用的时间（秒），未取消时为None"""
+        return self._teardown_time
+
+    def start(self):
+        if _IS_WINDOWS:
+            kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            # 进程组ID即为子进程的PID，make及其启动的编译器等均在该进程组中
+            kwargs = {"start_new_session": True}
+        self._process = subprocess.Popen(
+            self._cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            shell=self._shell,
+            cwd=self._cwd,
+            **kwargs,
+        )
+        self._reader = threading.Thread(
+            target=self._read_output, name="amake-output-reader", daemon=True
+        )
+        self._reader.start()
+
+    def terminate(self):
+        """请求结束整个进程组（POSIX下为SIGTERM，Windows下为CTRL_BREAK_EVENT）"""
+        if self._process is None:
+            return
+        if self._cancelled_at is None:
+            self._cancelled_at = time.monotonic()
+        if _IS_WINDOWS:
+            if self._process.poll() is None:
+                try:
+                    self._process.send_signal(signal.CTRL_BREAK_EVENT)
+                except OSError:
+                    pass
+            return
+        self._signal_group(signal.SIGTERM)
+
+    def kill(self):
+        """强制结束整个进程组"""
+        if self._process is None:
+            return
+        self._killed = True
+        if _IS_WINDOWS:
+            # Windows下没有进程组信号，以taskkill结束整个进程树
+            try:
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(self._process.pid)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            except OSError:
+                self._process.kill()
+            return
+        self._signal_group(signal.SIGKILL)
+
+    def run(
+        self,
+        on_output: Callable[[str], None],
+        is_cancelled: Optional[Callable[[], bool]] = None,
+        on_cancel: Optional[Callable[[], None]] = None,
+        on_poll: Optional[Callable[[], None]] = None,
+    ) -> int:
+        """
+        启动进程并在当前线程中转发其输出，直到进程结束且输出被全部转发，返回进程的退出码
+        is_cancelled()返回True时结束整个进程组，并在此之前调用一次on_cancel()，进程组在宽限期内
+        未全部退出时将被强制结束，此后可通过teardown_time获取结束进程组所用的时间
+        on_poll()在每次等待输出之后调用（无论是否有输出，间隔不超过POLL_INTERVAL），可用于定时刷新
+        回调抛出异常时，强制结束整个进程组后向外抛出该异常
+        """
+        if self._process is None:
+            self.start()
+        completed = False
+        try:
+            finished = self._forward_output(on_output, is_cancelled, on_cancel, on_poll)
+            if not finished:
+                # 进程已退出，但输出管道仍被其后台子进程持有，不再等待管道关闭
+                self._abandon_reader()
+            if self._cancelled_at is not None:
+                # 输出管道关闭后，进程组中可能仍有不再输出的进程
+                self._wait_group()
+            if finished:
+                self._reader.join()
+            returncode = self._process.wait()
+            completed = True
+        finally:
+            if not completed:
+                # 回调抛出异常时，结束整个进程组并停止读取线程，以免泄漏进程及线程
+                self.kill()
+                self._abandon_reader()
+                timeout = max(self._kill_grace_period, POLL_INTERVAL)
+                self._reader.join(timeout)
+                # 回收已被结束的进程，以免其成为僵尸进程
+                try:
+                    self._process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    pass
+        if self._cancelled_at is not None:
+            self._teardown_time = time.monotonic() - self._cancelled_at
+        return returncode
+
+    def _forward_output(
+        self,
+        on_output: Callable[[str], None],
+        is_cancelled: Optional[Callable[[], bool]],
+        on_cancel: Optional[Callable[[], None]],
+        on_poll: Optional[Callable[[], None]],
+    ) -> bool:
+        """转发输出，直到读取到末尾（返回True），或进程退出后在EXIT_DRAIN_TIMEOUT内没有新的输出（返回False）"""
+        last_output = time.monotonic()
+        while True:
+            texts, finished = self._take_output()
+            if texts:
+                last_output = time.monotonic()
+                on_output("".join(texts))
+            if on_poll:
+                on_poll()
+            if finished:
+                return True
+            if self._cancelled_at is None:
+                if is_cancelled and is_cancelled():
+                    if on_cancel:
+                        on_cancel()
+                    self.terminate()
+            elif not self._killed and self._grace_period_expired():
+                self.kill()
+            if (
+                self._process.poll() is not None
+                and time.monotonic() - last_output >= EXIT_DRAIN_TIMEOUT
+            ):
+                return False
+
+    def _abandon_reader(self):
+        self._abandoned.set()
+        # 取出队列中的全部内容，使可能阻塞在put()上的读取线程继续运行
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _grace_period_expired(self) -> bool:
+        return time.monotonic() - self._cancelled_at >= self._kill_grace_period
+
+    def _wait_group(self):
+        # SIGKILL无法被忽略，强制结束后不再等待（已退出的进程由init回收）
+        while not self._killed and self._group_alive():
+            if self._grace_period_expired():
+                self.kill()
+                return
+            time.sleep(POLL_INTERVAL)
+
+    def _group_alive(self) -> bool:
+        # 先回收shell进程，否则已退出但未回收的进程仍被视为进程组的成员
+        shell_alive = self._process.poll() is None
+        if _IS_WINDOWS:
+            return shell_alive
+        try:
+            os.killpg(self._process.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _signal_group(self, sig: int):
+        try:
+            os.killpg(self._process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _take_output(self):
+        """等待输出到达，返回(已到达的全部输出, 是否已读取到末尾)"""
+        texts = []
+        try:
+            item = self._queue.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            return texts, False
+        while True:
+            if item is _EOF:
+                return texts, True
+            texts.append(item)
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return texts, False
+
+    def _read_output(self):
+        stream = self._process.stdout
+        # 与universal_newlines=True时相同，将\r\n及\r转换为\n，跨越两次读取的\r\n也能正确处理
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(self._encoding)(errors="replace"),
+            translate=True,
+        )
+        pending = ""
+        try:
+            while True:
+                chunk = stream.read1(self._chunk_size)
+                if not chunk:
+                    break
+                text = pending + decoder.decode(chunk)
+                end = text.rfind("\n") + 1
+                # 只转发完整的行；过长的不完整行（如进度条）也直接转发，以免无限累积
+                if end == 0 and len(text) >= self._chunk_size:
+                    end = len(text)
+                if end:
+                    self._put(text[:end])
+                pending = text[end:]
+            pending += decoder.decode(b"", final=True)
+            if pending:
+                self._put(pending)
+        finally:
+            stream.close()
+            self._put(_EOF)
+
+    def _put(self, item):
+        if not self._abandoned.is_set():
+            self._queue.put(item)
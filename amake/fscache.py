@@ -0,0 +1,192 @@
+"""
+进程内共享的目录扫描缓存
+缓存每个目录的os.scandir()结果，以目录的绝对路径为键，并记录扫描时目录的mtime，
+目录的mtime未变化时（即目录中未增删条目）直接使用缓存，多个变量扫描相互重叠的目录树时，每个目录只需读取一次
+"""
+
+import dataclasses
+import fnmatch
+import functools
+import os
+import re
+import threading
+import time
+from typing import Dict, FrozenSet, Iterator, List, Optional, Pattern, Tuple
+
+# 目录的mtime与扫描时刻过于接近时，扫描之后的修改可能不会改变mtime（mtime精度有限），此类结果不缓存
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+@dataclasses.dataclass(frozen=True)
+class DirEntry(object):
+    name: str
+    is_dir: bool
+    is_symlink: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class _Listing(object):
+    mtime_ns: int
+    entries: Tuple[DirEntry, ...]
+    names: FrozenSet[str]
+
+
+_EMPTY_LISTING = _Listing(0, (), frozenset())
+
+
+@dataclasses.dataclass(frozen=True)
+class ScandirCacheInfo(object):
+    hits: int
+    misses: int
+    currsize: int
+
+
+class ScandirCache(object):
+    """线程安全的目录扫描缓存，目录中的条目按名称排序，以保证结果的顺序稳定"""
+
+    def __init__(self):
+        self._data: Dict[str, _Listing] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def entries(self, dir_path: str) -> Tuple[DirEntry, ...]:
+        """返回目录中的条目，目录不存在或无法读取时返回空元组"""
+        return self._listing(dir_path).entries
+
+    def contains(self, path: str) -> bool:
+        """通过父目录的条目判断路径是否存在，只需扫描父目录一次即可判断其中的全部路径"""
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        if not name or parent == path:
+            return os.path.exists(path)
+        return name in self._listing(parent).names
+
+    def _listing(self, dir_path: str) -> _Listing:
+        key = os.path.abspath(dir_path or ".")
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            return _EMPTY_LISTING
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        try:
+            entries = tuple(sorted(_scan(key), key=lambda e: e.name))
+        except OSError:
+            return _EMPTY_LISTING
+        listing = _Listing(mtime_ns, entries, frozenset(e.name for e in entries))
+        if time.time_ns() - mtime_ns > _RACY_WINDOW_NS:
+            with self._lock:
+                self._data[key] = listing
+        return listing
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> ScandirCacheInfo:
+        with self._lock:
+            return ScandirCacheInfo(self._hits, self._misses, len(self._data))
+
+
+def _scan(dir_path: str) -> Iterator[DirEntry]:
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                is_symlink = entry.is_symlink()
+            except OSError:
+                continue
+            yield DirEntry(entry.name, is_dir, is_symlink)
+
+
+_scandir_cache = ScandirCache()
+
+
+def get_scandir_cache() -> ScandirCache:
+    return _scandir_cache
+
+
+def clear_scandir_cache():
+    _scandir_cache.clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_part(part: str) -> Pattern:
+    return re.compile(fnmatch.translate(part))
+
+
+def _is_hidden_match(name: str, part: str) -> bool:
+    # 与glob模块一致，不以"."开头的模式不匹配隐藏文件
+    return name.startswith(".") and not part.startswith(".")
+
+
+def iglob(
+    root: str, pattern: str, cache: Optional[ScandirCache] = None
+) -> Iterator[str]:
+    """
+    在root目录下查找与pattern匹配的文件（不包括目录），返回相对于root的路径，以"/"分隔
+    pattern中以"/"分隔各级目录，"**"匹配零或多级目录（不进入指向目录的符号链接，以免循环）
+    """
+    cache = cache or _scandir_cache
+    parts = [part for part in pattern.replace(os.sep, "/").split("/") if part]
+    if not parts:
+        return iter(())
+    return _iglob(cache, root or ".", "", parts, 0)
+
+
+def _iglob(
+    cache: ScandirCache, dir_path: str, rel: str, parts: List[str], i: int
+) -> Iterator[str]:
+    part = parts[i]
+    last = i == len(parts) - 1
+    if part == "**":
+        if last:
+            yield from _walk_files(cache, dir_path, rel)
+            return
+        yield from _iglob(cache, dir_path, rel, parts, i + 1)
+        for entry in cache.entries(dir_path):
+            if entry.is_dir and not entry.is_symlink and not entry.name.startswith("."):
+                yield from _iglob(
+                    cache,
+                    os.path.join(dir_path, entry.name),
+                    rel + entry.name + "/",
+                    parts,
+                    i,
+                )
+        return
+
+    match = _compile_part(part).match
+    for entry in cache.entries(dir_path):
+        if not match(entry.name) or _is_hidden_match(entry.name, part):
+            continue
+        if last:
+            if not entry.is_dir:
+                yield rel + entry.name
+        elif entry.is_dir:
+            yield from _iglob(
+                cache,
+                os.path.join(dir_path, entry.name),
+                rel + entry.name + "/",
+                parts,
+                i + 1,
+            )
+
+
+def _walk_files(cache: ScandirCache, dir_path: str, rel: str) -> Iterator[str]:
+    for entry in cache.entries(dir_path):
+        if entry.name.startswith("."):
+            continue
+        if not entry.is_dir:
+            yield rel + entry.name
+        elif not entry.is_symlink:
+            yield from _walk_files(
+                cache, os.path.join(dir_path, entry.name), rel + entry.name + "/"
+            )
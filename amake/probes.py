@@ -0,0 +1,261 @@
+"""
+探测本地工具链（pkg-config、编译器、可执行程序）的结果缓存
+探测需要启动外部进程，开销较大，因此将结果保存在APP_DATADIR下的文件中，键中包含工具的路径、
+修改时间、大小及参数，工具被替换或升级后缓存自动失效；结果超过有效期（TTL）后重新探测
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROBE_CACHE_FILENAME = "probes.cache.json"
+PROBE_CACHE_VERSION = 1
+# 探测结果的默认有效期（秒）
+DEFAULT_PROBE_TTL = 7 * 24 * 3600
+PROBE_TIMEOUT = 60
+
+
+class ProbeError(RuntimeError):
+    pass
+
+
+def _default_cache_file() -> str:
+    from .consts import APP_DATADIR
+
+    return os.path.join(APP_DATADIR, PROBE_CACHE_FILENAME)
+
+
+def tool_identity(program: str) -> Optional[Tuple[str, int, int]]:
+    """返回工具的(绝对路径, 修改时间, 大小)，找不到工具时返回None"""
+    path = shutil.which(program)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_mtime_ns, st.st_size
+
+
+class ProbeCache(object):
+    """
+    线程安全的探测结果缓存，首次使用时从文件加载，每次存入新结果后写回文件
+    写回前会合并文件中其他进程新写入的结果，并以原子替换的方式写入
+    """
+
+    def __init__(
+        self, cache_file: Optional[str] = None, ttl: float = DEFAULT_PROBE_TTL
+    ):
+        self._cache_file = cache_file
+        self._ttl = ttl
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        # 早于此时刻的结果视为过期，用于强制重新探测
+        self._not_before = 0.0
+
+    @property
+    def cache_file(self) -> str:
+        if self._cache_file is None:
+            self._cache_file = _default_cache_file()
+        return self._cache_file
+
+    def refresh(self):
+        """忽略此前保存的全部结果，此后每项探测在本进程中重新执行一次"""
+        with self._lock:
+            self._not_before = time.time()
+
+    def get_or_probe(
+        self,
+        key: List[Any],
+        probe: Callable[[], Any],
+        is_valid: Optional[Callable[[Any], bool]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        返回key对应的结果，不存在或已过期时调用probe()探测，并保存其结果
+        key及结果必须可以被序列化为JSON，probe()抛出异常时不保存结果
+        is_valid(result)返回False的已保存结果视为失效，cacheable(result)返回False的结果不保存
+        """
+        key_str = json.dumps(key, ensure_ascii=False)
+        with self._lock:
+            entry = self._load().get(key_str)
+        if (
+            entry is not None
+            and self._is_fresh(entry)
+            and (is_valid is None or is_valid(entry["result"]))
+        ):
+            return entry["result"]
+
+        result = probe()
+        if cacheable is not None and not cacheable(result):
+            return result
+        with self._lock:
+            self._load()[key_str] = {"time": time.time(), "result": result}
+            self._save(key_str)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            try:
+                os.remove(self.cache_file)
+            except OSError:
+                pass
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        stored_at = entry.get("time", 0)
+        return stored_at >= self._not_before and time.time() - stored_at <= self._ttl
+
+    def _read_file(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != PROBE_CACHE_VERSION:
+            return {}
+        entries = data.get("entries")
+        return entries if isinstance(entries, dict) else {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._read_file()
+        return self._entries
+
+    def _save(self, updated_key: str):
+        entries = self._read_file()
+        # 保留其他进程写入的结果，本进程的结果优先
+        entries.update(self._entries)
+        # 不再保存已过期的结果
+        now = time.time()
+        entries = {
+            k: v
+            for k, v in entries.items()
+            if k == updated_key or now - v.get("time", 0) <= self._ttl
+        }
+        self._entries = entries
+        cache_dir = os.path.dirname(self.cache_file) or "."
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(
+                prefix=".probes.", suffix=".tmp", dir=cache_dir
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": PROBE_CACHE_VERSION, "entries": entries},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            # 缓存只用于加速，写入失败不影响探测结果
+            _report_error(f"failed to save probe cache {self.cache_file}: {e}")
+
+
+def _report_error(msg: str):
+    import builtins
+    from .consts import GLOBAL_VARNAME_ERROR_FUNC
+
+    getattr(builtins, GLOBAL_VARNAME_ERROR_FUNC, print)(msg)
+
+
+_probe_cache = ProbeCache()
+
+
+def get_probe_cache() -> ProbeCache:
+    return _probe_cache
+
+
+def refresh_probes():
+    _probe_cache.refresh()
+
+
+def _run(
+    cmd: List[str], input_text: Optional[str] = None
+) -> subprocess.CompletedProcess:
+    try:
+        return subprocess.run(
+            cmd,
+            input=input_text,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            timeout=PROBE_TIMEOUT,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        raise ProbeError(f"failed to run {cmd[0]}: {e}") from e
+
+
+def _is_executable(path: str) -> bool:
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def find_program(name: str) -> str:
+    """
+    在PATH中查找程序，返回其绝对路径，找不到时返回空字符串
+    找不到的结果不保存，以便之后安装的程序能被立即找到；返回保存的路径前检查其是否仍然可执行
+    """
+    if not name:
+        return ""
+    key = ["find_program", name, os.environ.get("PATH", "")]
+
+    def _probe() -> str:
+        path = shutil.which(name)
+        return os.path.abspath(path) if path else ""
+
+    return _probe_cache.get_or_probe(
+        key, _probe, is_valid=_is_executable, cacheable=bool
+    )
+
+
+def pkg_config(packages: List[str], option: str) -> str:
+    """执行pkg-config，option为--cflags、--libs等，返回去除首尾空白的输出"""
+    tool = tool_identity("pkg-config")
+    if tool is None:
+        raise ProbeError("pkg-config not found")
+    key = [
+        "pkg_config",
+        *tool,
+        option,
+        packages,
+        os.environ.get("PKG_CONFIG_PATH", ""),
+    ]
+
+    def _probe() -> str:
+        proc = _run([tool[0], option, *packages])
+        if proc.returncode != 0:
+            raise ProbeError(
+                f"pkg-config {option} {' '.join(packages)} failed: {proc.stderr.strip()}"
+            )
+        return proc.stdout.strip()
+
+    return _probe_cache.get_or_probe(key, _probe)
+
+
+_FLAG_TEST_SOURCE = "int main(void) { return 0; }\n"
+
+
+def compiler_supports_flag(compiler: str, flag: str) -> bool:
+    """
+    以flag编译一个最小的C程序，判断编译器是否支持该选项，同时启用-Werror，
+    以识别只对未知选项给出警告的编译器；找不到编译器时返回False
+    """
+    tool = tool_identity(compiler)
+    if tool is None:
+        return False
+    key = ["compiler_supports_flag", *tool, flag]
+
+    def _probe() -> bool:
+        proc = _run(
+            [tool[0], flag, "-Werror", "-x", "c", "-c", "-", "-o", os.devnull],
+            _FLAG_TEST_SOURCE,
+        )
+        return proc.returncode == 0
+
+    return _probe_cache.get_or_probe(key, _probe)
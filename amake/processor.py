@@ -1,7 +1,41 @@
 import ast
+import copy
 import dataclasses
 import inspect
-from typing import List, Any, Callable, Dict, Optional
+import functools
+import re
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import (
+    List,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Optional,
+    Tuple,
+    Hashable,
+    Iterable,
+)
+
+from .tracing import PipelineTrace, StageRecord
+from .typecheck import Types, describe, exact_type, is_compatible, signature_types
+
+DEFAULT_PIPELINE_CACHE_SIZE = 256
+# 默认不记忆化：内置处理器的开销很小，冻结输入及复制结果的开销往往超过重新计算，
+# 只在注册了开销较大的纯函数处理器时，才值得通过memo_size启用
+DEFAULT_MEMO_SIZE = 0
+DEFAULT_ARGUMENT_CACHE_SIZE = 1024
+# 元素数量超过此值的输入不进行记忆化，以免冻结输入的开销及缓存占用的内存超过重新计算的收益
+MEMO_MAX_ITEMS = 4096
 
 
 class ProcessorError(RuntimeError):
@@ -24,159 +58,859 @@ class InvalidArgument(ProcessorError):
     pass
 
 
+class ProcessorTypeError(ProcessorError):
+    pass
+
+
+class ProcessorBatchError(ProcessorError):
+    """
+    批量执行管道时，部分管道执行失败，errors为各失败项对应的异常，results为成功项的结果
+    """
+
+    def __init__(
+        self, errors: Dict[Hashable, BaseException], results: Dict[Hashable, Any]
+    ):
+        self.errors = errors
+        self.results = results
+        details = "; ".join(f"{key}: {error}" for key, error in errors.items())
+        super().__init__(f"failed to process {len(errors)} value(s): {details}")
+
+
+@dataclasses.dataclass(frozen=True)
+class ProcessorTraits(object):
+    """
+    处理器函数的附加特性，执行器据此对管道进行优化，使用processor_traits()声明
+    """
+
+    # 逐元素映射函数，声明后该处理器须等价于 [item_mapper(x, *args) for x in input_data]
+    item_mapper: Optional[Callable] = None
+    # 逐元素过滤函数，声明后该处理器须等价于 [x for x in input_data if item_predicate(x, *args)]
+    item_predicate: Optional[Callable] = None
+    # 可选，与item_mapper/item_predicate等价的表达式模板，合并时直接内联到生成的循环中，
+    # 以避免逐元素的函数调用，{x}表示元素，{args}表示全部参数，{0}、{1}...表示各个参数
+    item_template: Optional[str] = None
+    # 处理器是否可以接收任意可迭代对象（而不仅是列表）作为输入，流式执行时，
+    # 此类处理器直接消费上一阶段产生的迭代器，其余处理器在执行前会先将迭代器转换为列表
+    accepts_iterable: bool = False
+    # 处理器是否为纯函数，即输出只取决于输入和参数，且不修改输入，
+    # 仅由纯函数组成的管道，执行器会缓存其(管道, 输入)对应的结果
+    pure: bool = False
+    # 类型守卫，以管道中的参数调用，返回该处理器所检查的类型名称，输入恰好为该类型时处理器等价于恒等函数，
+    # 若能证明输入的类型，执行器将省略该处理器，如ensure_str、ensure_type
+    guarded_type: Optional[Callable[..., Any]] = None
+
+    @property
+    def element_wise(self) -> bool:
+        return self.item_mapper is not None or self.item_predicate is not None
+
+
+_TRAITS_ATTR = "__processor_traits__"
+
+
+def processor_traits(func: Callable, **traits: Any) -> Callable:
+    """为处理器函数声明特性，可用的特性见ProcessorTraits，返回原函数"""
+    current = get_processor_traits(func)
+    setattr(func, _TRAITS_ATTR, dataclasses.replace(current, **traits))
+    return func
+
+
+def get_processor_traits(func: Callable) -> ProcessorTraits:
+    return getattr(func, _TRAITS_ATTR, None) or ProcessorTraits()
+
+
+@dataclasses.dataclass(frozen=True)
+class ProcessorFunction(object):
+    """
+    已注册的处理器函数，其调用约定在注册时确定，执行时无需再次检查函数签名
+    """
+
+    name: str
+    func: Callable
+    # 函数是否接收除输入数据之外的参数，只有一个参数的函数将忽略管道中传入的参数
+    accepts_args: bool
+    traits: ProcessorTraits = ProcessorTraits()
+    # 根据函数注解得到的输入、输出类型，None表示未知
+    input_types: Types = None
+    output_types: Types = None
+
+    @classmethod
+    def create(cls, func: Callable, name: str) -> "ProcessorFunction":
+        sig = inspect.signature(func)
+        params = list(sig.parameters.values())
+        if len(params) == 0:
+            raise InvalidProcessorFunction(f"at least one parameter is required")
+        input_types, output_types = signature_types(func)
+        return cls(
+            name=name,
+            func=func,
+            accepts_args=len(params) > 1,
+            traits=get_processor_traits(func),
+            input_types=input_types,
+            output_types=output_types,
+        )
+
+
 @dataclasses.dataclass
 class Command(object):
     name: str
     func: Callable
     args: List[Any]
+    accepts_args: bool = True
+    traits: ProcessorTraits = ProcessorTraits()
+    input_types: Types = None
+    output_types: Types = None
 
 
-class CommandTokenizer(object):
-    def __init__(self, invalid_arg_handler: Callable[[str], Any] = lambda x: x):
-        self._invalid_arg_handler = invalid_arg_handler
+@dataclasses.dataclass
+class Pipeline(object):
+    """
+    已编译的管道，commands为解析后的命令，func为将各命令串联后得到的可调用对象，
+    streaming_func为流式执行时使用的可调用对象，在首次需要时才编译
+    """
+
+    source: str
+    commands: Tuple[Command, ...]
+    func: Callable[[Any], Any]
+    streaming_func: Optional[Callable[[Any], Any]] = None
+    # 参数中引用的变量名称，见find_references()
+    references: FrozenSet[str] = frozenset()
 
-    @staticmethod
-    def tokenize(command_str: str) -> List[str]:
-        """
-        将命令字符串分割为token
-        支持识别带引号的字符串和复杂数据结构
-        """
-        tokens = []
-        current_token = ""
-        in_quotes = None  # 当前是否在引号内，None表示不在，'或"表示在哪种引号内
-        in_brackets = 0  # 括号嵌套深度
-        in_parens = 0  # 圆括号嵌套深度
-        escape_next = False  # 是否转义下一个字符
-
-        i = 0
-        while i < len(command_str):
-            char = command_str[i]
-
-            # 处理转义字符
-            if escape_next:
-                current_token += char
-                escape_next = False
-                i += 1
+    @property
+    def pure(self) -> bool:
+        return all(command.traits.pure for command in self.commands)
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheInfo(object):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class _LRUCache(object):
+    """
+    线程安全的LRU缓存，maxsize <= 0时表示禁用缓存
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self, reset_stats: bool = False):
+        with self._lock:
+            self._data.clear()
+            if reset_stats:
+                self._hits = 0
+                self._misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                maxsize=self._maxsize,
+                currsize=len(self._data),
+            )
+
+
+# 可以直接作为记忆化键的不可变类型，使用精确的类型匹配，子类不进行记忆化
+_MEMO_ATOM_TYPES = frozenset((str, int, float, bool, type(None), bytes))
+
+
+class _Unmemoizable(Exception):
+    pass
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    将输入转换为可哈希的记忆化键，键中包含类型信息，以区分1、1.0、True及[1]、(1,)等相等但类型不同的值
+    无法安全冻结的值抛出_Unmemoizable
+    """
+    value_type = type(value)
+    if value_type in _MEMO_ATOM_TYPES:
+        return value_type, value
+    if value_type is list or value_type is tuple:
+        return value_type, tuple(map(_freeze, value))
+    if value_type is dict:
+        return value_type, tuple((_freeze(k), _freeze(v)) for k, v in value.items())
+    if value_type is set or value_type is frozenset:
+        return value_type, frozenset(map(_freeze, value))
+    raise _Unmemoizable()
+
+
+def _copy_result(value: Any) -> Any:
+    """复制缓存的结果，避免调用者修改返回值后影响缓存"""
+    value_type = type(value)
+    if value_type in _MEMO_ATOM_TYPES:
+        return value
+    if value_type is list:
+        return [_copy_result(x) for x in value]
+    if value_type is tuple:
+        return tuple(map(_copy_result, value))
+    if value_type is dict:
+        return {k: _copy_result(v) for k, v in value.items()}
+    if value_type is set:
+        return set(value)
+    return copy.deepcopy(value)
+
+
+def _memo_key(identity: Hashable, value: Any) -> Optional[Hashable]:
+    """返回记忆化键，identity为管道的标识，输入不可记忆化时返回None"""
+    if isinstance(value, (list, tuple, dict, set, frozenset)):
+        if len(value) > MEMO_MAX_ITEMS:
+            return None
+    try:
+        return identity, _freeze(value)
+    except _Unmemoizable:
+        return None
+
+
+# 参数中对其他变量的引用，形如${NAME}
+_REFERENCE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+def find_references(pipeline_str: str) -> FrozenSet[str]:
+    """返回管道字符串中以${NAME}形式引用的名称"""
+    if "${" not in pipeline_str:
+        return frozenset()
+    return frozenset(_REFERENCE.findall(pipeline_str))
+
+
+def _arg_references(args: Iterable[Any]) -> FrozenSet[str]:
+    names = set()
+    for arg in args:
+        if isinstance(arg, str) and "${" in arg:
+            names.update(_REFERENCE.findall(arg))
+    return frozenset(names)
+
+
+def _resolve_references(arg: Any, variables: Dict[str, Any]) -> Any:
+    """
+    将字符串参数中的引用替换为对应的值，参数恰好为单个引用时替换为值本身（保留其类型），
+    否则以值的字符串形式进行插值，variables中不存在的引用保持原样
+    """
+    if not isinstance(arg, str) or "${" not in arg:
+        return arg
+    match = _REFERENCE.fullmatch(arg)
+    if match and match.group(1) in variables:
+        return variables[match.group(1)]
+
+    def _substitute(m: "re.Match") -> str:
+        name = m.group(1)
+        return str(variables[name]) if name in variables else m.group(0)
+
+    return _REFERENCE.sub(_substitute, arg)
+
+
+_MISSING = object()
+
+
+def _reset_memory_peak() -> int:
+    """重置tracemalloc记录的内存峰值，返回当前已分配的内存"""
+    current = tracemalloc.get_traced_memory()[0]
+    if _HAS_RESET_PEAK:
+        tracemalloc.reset_peak()
+    return current
+
+
+def _memory_allocated_since(memory_before: int) -> int:
+    # reset_peak()在Python 3.9中加入，此前的版本无法得到阶段内的峰值，只能以执行后仍占用的内存近似
+    current, peak = tracemalloc.get_traced_memory()
+    return max(0, (peak if _HAS_RESET_PEAK else current) - memory_before)
+
+
+_HAS_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+
+# 进程池工作进程中使用的执行器，由_init_worker_executor()在工作进程启动时创建
+_worker_executor: Optional["ProcessorExecutor"] = None
+
+
+def _init_worker_executor(
+    functions: List[Tuple[str, Callable]],
+    invalid_arg_handler: Callable[[str], Any],
+    cache_size: int,
+    memo_size: int,
+):
+    global _worker_executor
+    _worker_executor = ProcessorExecutor(invalid_arg_handler, cache_size, memo_size)
+    for name, func in functions:
+        _worker_executor.register(func, name)
+
+
+def _execute_in_worker(
+    pipeline_str: str,
+    initial_input: Any,
+    streaming: bool,
+    variables: Optional[Dict[str, Any]],
+) -> Any:
+    return _worker_executor.execute(
+        pipeline_str, initial_input, streaming=streaming, variables=variables
+    )
+
+
+# 扫描时需要特殊处理的字符，其余字符可以整段跳过
+_SPECIAL_CHARS = re.compile(r"[\\'\"\[\]() |]")
+_LEADING_SPACES = re.compile(r"\s*")
+_QUOTED_CHARS = {"'": re.compile(r"['\\]"), '"': re.compile(r'["\\]')}
+
+
+def _scan(text: str, split_pipes: bool) -> List[Tuple[int, int, List[Tuple[int, int]]]]:
+    """
+    单次扫描文本，返回每一部分的(起始位置, 结束位置, token位置列表)
+    split_pipes为True时，按引号外的管道符号分割文本，且每一部分的token只在去除首尾空白后的范围内识别；
+    否则整个文本作为一个部分。token均以切片位置表示，不逐字符拼接字符串
+    """
+    n = len(text)
+    search = _SPECIAL_CHARS.search
+    parts = []
+
+    part_start = 0
+    pipe_quotes = None  # 分割管道时的引号状态，不受括号影响
+    in_quotes = None  # 分割token时的引号状态，None表示不在引号内
+    in_brackets = 0  # 方括号嵌套深度
+    in_parens = 0  # 圆括号嵌套深度
+    spans = []
+    token_start = -1  # 当前token的起始位置，-1表示当前没有token
+
+    def _finish_part(part_end: int):
+        if token_start >= 0:
+            spans.append((token_start, part_end))
+        if split_pipes and spans:
+            # 去除尾部空白，落在空白中的token部分需要裁掉
+            stripped_end = part_start + len(text[part_start:part_end].rstrip())
+            if spans[-1][1] > stripped_end:
+                spans[:] = [
+                    (start, min(end, stripped_end))
+                    for start, end in spans
+                    if start < stripped_end
+                ]
+        parts.append((part_start, part_end, spans))
+
+    pos = _LEADING_SPACES.match(text).end() if split_pipes else 0
+    while True:
+        match = search(text, pos)
+        i = match.start() if match else n
+        # 普通字符，直接并入当前token
+        if i > pos and token_start < 0:
+            token_start = pos
+        if match is None:
+            break
+
+        char = text[i]
+        pos = i + 1
+
+        # 处理转义字符，转义符与其后的字符一并计入token
+        if char == "\\":
+            if token_start < 0:
+                token_start = i
+            pos = i + 2
+            continue
+
+        # 处理空格分隔（仅在不在引号或括号内时）
+        if char == " ":
+            if in_quotes is None and in_brackets == 0 and in_parens == 0:
+                if token_start >= 0:
+                    spans.append((token_start, i))
+                    token_start = -1
                 continue
 
-            if char == "\\":
-                escape_next = True
-                current_token += char
-                i += 1
+        # 处理管道符号（仅在不在引号内时分割）
+        elif char == "|":
+            if split_pipes and pipe_quotes is None:
+                _finish_part(i)
+                part_start = i + 1
+                in_quotes = None
+                in_brackets = 0
+                in_parens = 0
+                spans = []
+                token_start = -1
+                pos = _LEADING_SPACES.match(text, part_start).end()
                 continue
 
-            # 处理引号
-            if char in ('"', "'") and in_brackets == 0 and in_parens == 0:
+        # 处理引号
+        elif char == '"' or char == "'":
+            if pipe_quotes is None:
+                pipe_quotes = char
+            elif pipe_quotes == char:
+                pipe_quotes = None
+            if in_brackets == 0 and in_parens == 0:
                 if in_quotes is None:
                     in_quotes = char
                 elif in_quotes == char:
                     in_quotes = None
-                current_token += char
-                i += 1
+            if in_quotes == char and pipe_quotes == char:
+                # 两种状态都处于同一种引号内时，直到下一个相同引号或转义符之前的字符都不影响状态，可整段跳过
+                if token_start < 0:
+                    token_start = i
+                match = _QUOTED_CHARS[char].search(text, pos)
+                pos = match.start() if match else n
                 continue
 
-            # 处理方括号（列表）
-            if char == "[" and in_quotes is None:
+        # 处理方括号（列表）与圆括号（元组）
+        elif in_quotes is None:
+            if char == "[":
                 in_brackets += 1
-                current_token += char
-                i += 1
-                continue
-
-            if char == "]" and in_quotes is None and in_brackets > 0:
+            elif char == "]" and in_brackets > 0:
                 in_brackets -= 1
-                current_token += char
-                i += 1
-                continue
-
-            # 处理圆括号（元组）
-            if char == "(" and in_quotes is None:
+            elif char == "(":
                 in_parens += 1
-                current_token += char
-                i += 1
-                continue
-
-            if char == ")" and in_quotes is None and in_parens > 0:
+            elif char == ")" and in_parens > 0:
                 in_parens -= 1
-                current_token += char
-                i += 1
-                continue
 
-            # 处理空格分隔（仅在不在引号或括号内时）
-            if (
-                char == " "
-                and in_quotes is None
-                and in_brackets == 0
-                and in_parens == 0
-            ):
-                if current_token:
-                    tokens.append(current_token)
-                    current_token = ""
-                i += 1
-                continue
+        if token_start < 0:
+            token_start = i
+
+    _finish_part(n)
+    return parts
+
+
+def _identity(data: Any) -> Any:
+    return data
+
+
+def _bind_args(command: Command, prefix: str, namespace: Dict[str, Any]) -> List[str]:
+    """将命令的参数作为常量放入namespace，返回参数在生成代码中的名称"""
+    if not command.accepts_args:
+        return []
+    arg_names = []
+    for j, arg in enumerate(command.args):
+        arg_name = f"{prefix}_{j}"
+        namespace[arg_name] = arg
+        arg_names.append(arg_name)
+    return arg_names
+
+
+def _generate_function(
+    source: str, func_name: str, namespace: Dict[str, Any], filename: str
+) -> Callable:
+    code = compile(source, filename, "exec")
+    exec(code, namespace)
+    return namespace[func_name]
+
+
+def _fuse_element_wise(
+    pipeline_str: str, commands: Tuple[Command, ...], lazy: bool = False
+) -> Callable[[Any], Any]:
+    """
+    将连续的逐元素处理器合并为一次遍历，只生成一个输出列表，例如 strip_each | no_empty | prefix_each '-I'
+    将生成如下函数（lazy为True时，不生成列表，而是返回逐个产生元素的生成器）：
+        def _fused(data):
+            if not data:
+                return f0(data)
+            out = []
+            append = out.append
+            for x in data:
+                x = x.strip()
+                if not x:
+                    continue
+                x = a2_0 + x
+                append(x)
+            return out
+    输入为空值时交由第一个处理器处理，以保持与逐个执行时相同的返回值或异常
+    """
+    namespace = {"f0": commands[0].func}
+    first_args = _bind_args(commands[0], "a0", namespace)
+    lines = [
+        "def _fused(data):",
+        "    if not data:",
+        f"        return f0({', '.join(['data', *first_args])})",
+    ]
+    if lazy:
+        lines += [
+            "    return _iterate(data)",
+            "def _iterate(data):",
+        ]
+    else:
+        lines += [
+            "    out = []",
+            "    append = out.append",
+        ]
+    lines.append("    for x in data:")
+    for i, command in enumerate(commands):
+        arg_names = _bind_args(command, f"a{i}", namespace)
+        traits = command.traits
+        if traits.item_template is not None:
+            expr = traits.item_template.format(
+                *arg_names, x="x", args=", ".join(arg_names)
+            )
+        else:
+            item_func = traits.item_mapper or traits.item_predicate
+            namespace[f"m{i}"] = item_func
+            expr = f"m{i}({', '.join(['x', *arg_names])})"
+        if traits.item_mapper is not None:
+            lines.append(f"        x = {expr}")
+        else:
+            lines.append(f"        if not ({expr}):")
+            lines.append("            continue")
+    if lazy:
+        lines.append("        yield x")
+    else:
+        lines.append("        append(x)")
+        lines.append("    return out")
+    source = "\n".join(lines) + "\n"
+    return _generate_function(
+        source, "_fused", namespace, f"<fused pipeline: {pipeline_str}>"
+    )
+
+
+def _can_fuse(command: Command) -> bool:
+    traits = command.traits
+    if not traits.element_wise:
+        return False
+    # 参数与处理器不匹配时不进行合并，保持在执行时抛出异常的行为
+    args = command.args if command.accepts_args else []
+    item_func = traits.item_mapper or traits.item_predicate
+    try:
+        inspect.signature(item_func).bind(None, *args)
+    except TypeError:
+        return False
+    except ValueError:
+        # 无法获取签名的内置函数，只在没有参数时合并
+        return not args
+    return True
+
+
+def _group_element_wise(
+    commands: Tuple[Command, ...],
+) -> List[Tuple[bool, Tuple[Command, ...]]]:
+    """
+    将命令序列分组，连续的逐元素处理器分为一组，其余命令各自一组，返回(是否为逐元素处理器组, 命令)
+    """
+    groups = []
+    run = []
+    for command in commands:
+        if _can_fuse(command):
+            run.append(command)
+            continue
+        if run:
+            groups.append((True, tuple(run)))
+            run = []
+        groups.append((False, (command,)))
+    if run:
+        groups.append((True, tuple(run)))
+    return groups
+
+
+def _compile_commands(
+    pipeline_str: str, commands: Tuple[Command, ...], streaming: bool = False
+) -> Callable[[Any], Any]:
+    """
+    为命令序列生成形如 f2(f1(f0(data, a0_0), a1_0)) 的函数，处理器函数与参数作为全局常量绑定
+    连续的逐元素处理器会先合并为一个处理器
+    streaming为True时，逐元素处理器组返回生成器，直接交给可以接收迭代器的下一个处理器，
+    只有在下一个处理器不能接收迭代器或管道结束时，才转换为列表
+    """
+    if not commands:
+        return _identity
+
+    namespace = {}
+    expr = "data"
+    # 当前表达式的结果是否为逐元素处理器组产生的迭代器
+    iterating = False
+    for i, (element_wise, group) in enumerate(_group_element_wise(commands)):
+        func_name = f"f{i}"
+        if element_wise and streaming:
+            namespace[func_name] = _fuse_element_wise(pipeline_str, group, lazy=True)
+            expr = f"{func_name}({expr})"
+            iterating = True
+            continue
+
+        if iterating and not group[0].traits.accepts_iterable:
+            expr = f"list({expr})"
+        iterating = False
+        if len(group) > 1:
+            namespace[func_name] = _fuse_element_wise(pipeline_str, group)
+            call_args = [expr]
+        else:
+            namespace[func_name] = group[0].func
+            call_args = [expr, *_bind_args(group[0], f"a{i}", namespace)]
+        expr = f"{func_name}({', '.join(call_args)})"
+    if iterating:
+        expr = f"list({expr})"
+
+    source = f"def _pipeline(data):\n    return {expr}\n"
+    return _generate_function(
+        source, "_pipeline", namespace, f"<pipeline: {pipeline_str}>"
+    )
+
+
+def _is_redundant_guard(command: Command, value_types: Types) -> bool:
+    """判断command是否为类型守卫，且其输入已被证明恰好为所检查的类型"""
+    guarded_type = command.traits.guarded_type
+    value_type = exact_type(value_types)
+    if guarded_type is None or value_type is None:
+        return False
+    args = command.args if command.accepts_args else []
+    try:
+        return value_type.__name__ == guarded_type(*args)
+    except Exception:
+        return False
+
+
+def _stage_output_types(command: Command, value_types: Types) -> Types:
+    """
+    推断command的输出类型，只有在处理器接收任意类型，或已证明输入恰好为其接收的类型时，才信任其返回值的注解，
+    否则（如prefix_ifneq收到了非str的输入，将原样返回该输入）输出类型未知
+    """
+    if command.input_types is None:
+        return command.output_types
+    if exact_type(value_types) is not None and is_compatible(
+        value_types, command.input_types
+    ):
+        return command.output_types
+    return None
+
+
+def _elide_guards(
+    commands: Tuple[Command, ...], input_type: type
+) -> Tuple[Command, ...]:
+    """
+    已知管道输入的确切类型时，沿管道推断各阶段的类型，省略输入类型已被证明的类型守卫
+    推断时信任处理器返回值的注解，即要求处理器返回的值恰好为其注解的类型
+    """
+    kept = []
+    value_types = (input_type,)
+    for command in commands:
+        if _is_redundant_guard(command, value_types):
+            continue
+        kept.append(command)
+        value_types = _stage_output_types(command, value_types)
+    return tuple(kept)
+
+
+def _compile_pipeline(
+    pipeline_str: str, commands: Tuple[Command, ...], streaming: bool = False
+) -> Callable[[Any], Any]:
+    """
+    编译管道，管道中包含类型守卫时，按照输入的类型分别编译，省略对该类型多余的类型守卫
+    """
+    if not any(command.traits.guarded_type for command in commands):
+        return _compile_commands(pipeline_str, commands, streaming)
+
+    specialized: Dict[type, Callable[[Any], Any]] = {}
+
+    def _specialized_pipeline(data: Any) -> Any:
+        input_type = type(data)
+        func = specialized.get(input_type)
+        if func is None:
+            kept = _elide_guards(commands, input_type)
+            func = _compile_commands(pipeline_str, kept, streaming)
+            specialized[input_type] = func
+        return func(data)
+
+    return _specialized_pipeline
+
+
+def _is_immutable(value: Any) -> bool:
+    value_type = type(value)
+    if value_type in _MEMO_ATOM_TYPES or value_type is complex:
+        return True
+    if value_type is tuple or value_type is frozenset:
+        return all(map(_is_immutable, value))
+    return False
+
+
+class CommandTokenizer(object):
+    def __init__(
+        self,
+        invalid_arg_handler: Callable[[str], Any] = _identity,
+        cache_size: int = DEFAULT_ARGUMENT_CACHE_SIZE,
+    ):
+        self._invalid_arg_handler = invalid_arg_handler
+        # 缓存token解析得到的字面量，值为(字面量, 是否不可变)，可变的字面量每次返回其副本
+        # 由invalid_arg_handler处理的token不进行缓存
+        self._value_cache = _LRUCache(cache_size)
 
-            current_token += char
-            i += 1
+    @staticmethod
+    def tokenize(command_str: str) -> List[str]:
+        """
+        将命令字符串分割为token
+        支持识别带引号的字符串和复杂数据结构
+        """
+        _, _, spans = _scan(command_str, split_pipes=False)[0]
+        return [command_str[start:end] for start, end in spans]
 
-        # 添加最后一个token
-        if current_token:
-            tokens.append(current_token)
-        return tokens
+    @staticmethod
+    def lex(pipeline_str: str) -> List[List[str]]:
+        """
+        单次扫描管道字符串，返回每个处理器的token列表（已跳过空的处理器）
+        结果与先调用ProcessorExecutor.split_processor_str()，再对去除首尾空白的每一部分调用tokenize()相同
+        """
+        return [
+            [pipeline_str[start:end] for start, end in spans]
+            for _, _, spans in _scan(pipeline_str, split_pipes=True)
+            if spans
+        ]
 
     def parse_value(self, token: str) -> Any:
+        cached = self._value_cache.get(token)
+        if cached is not None:
+            value, immutable = cached
+            return value if immutable else copy.deepcopy(value)
+
+        try:
+            value = self._parse_literal(token)
+        except BaseException as e:
+            if not self._invalid_arg_handler:
+                raise InvalidArgument(f"invalid argument: {token}") from e
+            return self._invalid_arg_handler(token)
+
+        immutable = _is_immutable(value)
+        self._value_cache.put(
+            token, (value if immutable else copy.deepcopy(value), immutable)
+        )
+        return value
+
+    @staticmethod
+    def _parse_literal(token: str) -> Any:
+        """将token解析为字面量，无法解析时抛出异常"""
         if not token:
             return ""
 
-        if token.lower() in ("none", "null"):
+        lowered = token.lower()
+        if lowered in ("none", "null"):
             return None
 
-        if token.lower() == "true":
+        if lowered == "true":
             return True
 
-        if token.lower() == "false":
+        if lowered == "false":
             return False
 
-        try:
-            return ast.literal_eval(token)
-        except BaseException as e:
-            if not self._invalid_arg_handler:
-                raise InvalidArgument(f"invalid argument: {token}") from e
-            return self._invalid_arg_handler(token)
+        return ast.literal_eval(token)
 
 
 class ProcessorExecutor(object):
-    def __init__(self, invalid_arg_handler: Callable[[str], Any] = lambda x: x):
-        self._registry: Dict[str, Callable] = {}
+    def __init__(
+        self,
+        invalid_arg_handler: Callable[[str], Any] = _identity,
+        cache_size: int = DEFAULT_PIPELINE_CACHE_SIZE,
+        memo_size: int = DEFAULT_MEMO_SIZE,
+        max_workers: int = 1,
+        use_processes: bool = False,
+    ):
+        """
+        max_workers大于1时，execute_all()使用线程池并发执行互相独立的管道，适用于访问文件系统等会释放GIL的处理器；
+        use_processes为True时改用进程池，适用于CPU密集的自定义处理器，此时已注册的处理器函数及
+        invalid_arg_handler必须可以被pickle（即定义在模块顶层的函数），工作进程会据此重建执行器
+        线程池、进程池在第一次并发执行时创建，此后的调用共用同一个池，注册表发生变化时重建，
+        不再使用执行器时应调用close()（或将执行器用作上下文管理器）以结束其中的线程、进程
+        """
+        self._registry: Dict[str, ProcessorFunction] = {}
+        self._invalid_arg_handler = invalid_arg_handler
         self._tokenizer = CommandTokenizer(invalid_arg_handler)
+        self._cache_size = cache_size
+        self._memo_size = memo_size
+        self._max_workers = max_workers
+        self._use_processes = use_processes
+        # 缓存已编译的管道，键为管道字符串，注册表发生变化时失效
+        self._pipeline_cache = _LRUCache(cache_size)
+        # 缓存纯函数管道的执行结果，键为(管道字符串, 冻结后的输入)，注册表发生变化时失效
+        self._memo = _LRUCache(memo_size)
+        self._memo_enabled = memo_size > 0
+        self._trace_hooks: List[Callable[[PipelineTrace], None]] = []
+        # 并发执行使用的线程池或进程池，及其工作线程（进程）的数量
+        self._pool: Optional[Executor] = None
+        self._pool_workers = 0
+        self._pool_lock = threading.Lock()
+        # 注册表每次变化时加一，外部可据此判断基于注册表得到的缓存是否仍然有效
+        self._registry_generation = 0
 
     def register(self, func: Callable, name: Optional[str] = None):
         if not callable(func):
             raise InvalidProcessorFunction(f"not a function")
 
-        sig = inspect.signature(func)
-        params = list(sig.parameters.values())
-        if len(params) == 0:
-            raise InvalidProcessorFunction(f"at least one parameter is required")
-
         if name is None:
             name = func.__name__
         if name in self._registry:
             raise ProcessorFunctionAlreadyExist(
                 f"pipeline function already exist: {name}"
             )
-        self._registry[name] = func
+        self._registry[name] = ProcessorFunction.create(func, name)
+        self._on_registry_changed()
 
     def unregister(self, name: str):
         if name not in self._registry:
             raise ProcessorFunctionNotFound(f"pipeline function not found: {name}")
         del self._registry[name]
+        self._on_registry_changed()
 
     def get_function(self, name: str) -> Callable:
+        return self.get_processor_function(name).func
+
+    def get_processor_function(self, name: str) -> ProcessorFunction:
         if name not in self._registry:
             raise ProcessorFunctionNotFound(f"pipeline function not found: {name}")
         return self._registry[name]
 
     def unregister_all(self):
         self._registry = {}
+        self._on_registry_changed()
+
+    def _on_registry_changed(self):
+        self._registry_generation += 1
+        self._pipeline_cache.clear()
+        self._memo.clear()
+        # 进程池的工作进程按创建时的注册表重建执行器，注册表变化后需要重新创建
+        self._discard_pool()
+
+    def close(self):
+        """结束并发执行使用的线程池或进程池，之后再次并发执行时会重新创建"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ProcessorExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def registry_generation(self) -> int:
+        return self._registry_generation
+
+    def is_pure(self, pipeline_str: str) -> bool:
+        """管道是否仅由纯函数组成，即相同的输入总是得到相同的结果"""
+        return self._get_pipeline(pipeline_str).pure
+
+    def pipeline_cache_info(self) -> CacheInfo:
+        return self._pipeline_cache.info()
+
+    def clear_pipeline_cache(self):
+        self._pipeline_cache.clear(reset_stats=True)
+
+    def memo_info(self) -> CacheInfo:
+        return self._memo.info()
+
+    def clear_memo(self):
+        self._memo.clear(reset_stats=True)
 
     @property
     def processor_functions(self) -> List[str]:
@@ -187,141 +921,449 @@ class ProcessorExecutor(object):
         """
         分割管道字符串，但忽略引号内的管道符号
         """
-        parts = []
-        current_part = ""
-        in_quotes = None
-        escape_next = False
-
-        i = 0
-        while i < len(pipeline_str):
-            char = pipeline_str[i]
-
-            # 处理转义字符
-            if escape_next:
-                current_part += char
-                escape_next = False
-                i += 1
-                continue
-
-            if char == "\\":
-                escape_next = True
-                current_part += char
-                i += 1
-                continue
+        parts = _scan(pipeline_str, split_pipes=True)
+        # 最后一个管道符号之后没有任何字符时，不添加最后一部分
+        last_start, last_end, _ = parts[-1]
+        if last_start == last_end:
+            parts.pop()
+        return [pipeline_str[start:end].strip() for start, end, _ in parts]
 
-            # 处理引号
-            if char in ('"', "'"):
-                if in_quotes is None:
-                    in_quotes = char
-                elif in_quotes == char:
-                    in_quotes = None
-                current_part += char
-                i += 1
-                continue
-
-            # 处理管道符号（仅在不在引号内时分割）
-            if char == "|" and in_quotes is None:
-                parts.append(current_part.strip())
-                current_part = ""
-                i += 1
-                continue
-
-            current_part += char
-            i += 1
+    def parse_processor(self, processor_str: str) -> List[Command]:
+        """解析管道字符串"""
+        return list(self._get_pipeline(processor_str).commands)
+
+    def compile(
+        self,
+        pipeline_str: str,
+        streaming: bool = False,
+        variables: Optional[Dict[str, Any]] = None,
+    ) -> Callable[[Any], Any]:
+        """
+        将管道编译为单个可调用对象，参数作为常量绑定，各处理器直接嵌套调用
+        对同一管道多次求值时，可以先编译，再直接调用返回的对象
+        streaming为True时，列表在逐元素处理器之间以迭代器的形式传递，只在最终需要时才生成列表，
+        可以显著降低处理超长列表时的内存峰值，但处理器抛出的异常可能推迟到消费迭代器的阶段
+        variables为参数中${NAME}形式的引用对应的值，引用在编译时替换为常量
+        管道仅由纯函数组成时，返回的对象会缓存每个输入对应的结果
+        """
+        if self._trace_hooks:
+            return functools.partial(
+                self._execute_traced, pipeline_str, variables=variables
+            )
+        identity, pipeline = self._resolve_pipeline(pipeline_str, variables)
+        if not streaming:
+            func = pipeline.func
+        else:
+            if pipeline.streaming_func is None:
+                pipeline.streaming_func = _compile_pipeline(
+                    pipeline_str, pipeline.commands, streaming=True
+                )
+            func = pipeline.streaming_func
+        if (
+            self._memo_enabled
+            and identity is not None
+            and pipeline.commands
+            and pipeline.pure
+        ):
+            return self._memoize(identity, func)
+        return func
+
+    def _memoize(
+        self, identity: Hashable, func: Callable[[Any], Any]
+    ) -> Callable[[Any], Any]:
+        memo = self._memo
+
+        def _memoized(data: Any) -> Any:
+            key = _memo_key(identity, data)
+            if key is None:
+                return func(data)
+            result = memo.get(key, _MISSING)
+            if result is _MISSING:
+                # 结果可能与输入是同一对象，缓存其副本，以免调用者修改输入后影响缓存
+                result = func(data)
+                memo.put(key, _copy_result(result))
+                return result
+            return _copy_result(result)
+
+        return _memoized
+
+    def _get_pipeline(self, processor_str: str) -> Pipeline:
+        """从缓存中获取已编译的管道，未命中时编译并放入缓存"""
+        pipeline = self._pipeline_cache.get(processor_str)
+        if pipeline is None:
+            commands = tuple(self._parse_processor(processor_str))
+            pipeline = Pipeline(
+                source=processor_str,
+                commands=commands,
+                func=_compile_pipeline(processor_str, commands),
+                references=_arg_references(
+                    arg for command in commands for arg in command.args
+                ),
+            )
+            self._pipeline_cache.put(processor_str, pipeline)
+        return pipeline
 
-        # 添加最后一部分
-        if current_part:
-            parts.append(current_part.strip())
+    def references(self, pipeline_str: str) -> FrozenSet[str]:
+        """返回管道参数中以${NAME}形式引用的名称"""
+        return self._get_pipeline(pipeline_str).references
 
-        return parts
+    def _resolve_pipeline(
+        self, pipeline_str: str, variables: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[Hashable], Pipeline]:
+        """
+        替换管道参数中的引用，返回(管道标识, 管道)，管道标识用作记忆化键的一部分，
+        引用的值无法冻结时为None，此时替换后的管道既不缓存，也不记忆化
+        """
+        pipeline = self._get_pipeline(pipeline_str)
+        if not variables or not pipeline.references:
+            return pipeline_str, pipeline
+        names = sorted(pipeline.references.intersection(variables))
+        if not names:
+            return pipeline_str, pipeline
+        try:
+            identity = (pipeline_str, _freeze([variables[name] for name in names]))
+        except _Unmemoizable:
+            identity = None
+        resolved = None
+        if identity is not None:
+            resolved = self._pipeline_cache.get(identity)
+        if resolved is None:
+            commands = tuple(
+                dataclasses.replace(
+                    command,
+                    args=[_resolve_references(arg, variables) for arg in command.args],
+                )
+                for command in pipeline.commands
+            )
+            resolved = Pipeline(
+                source=pipeline_str,
+                commands=commands,
+                func=_compile_pipeline(pipeline_str, commands),
+            )
+            if identity is not None:
+                self._pipeline_cache.put(identity, resolved)
+        return identity, resolved
 
-    def parse_processor(self, processor_str: str) -> List[Command]:
-        """解析管道字符串"""
+    def _parse_processor(self, processor_str: str) -> List[Command]:
         commands = []
-        parts = self.split_processor_str(processor_str)
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            tokens = self._tokenizer.tokenize(part)
+        for tokens in self._tokenizer.lex(processor_str):
             func_name = tokens[0]
-            func = self.get_function(func_name)
+            processor_func = self.get_processor_function(func_name)
             # 解析参数
             args = [self._tokenizer.parse_value(token) for token in tokens[1:]]
-            commands.append(Command(func_name, func, args))
+            commands.append(
+                Command(
+                    func_name,
+                    processor_func.func,
+                    args,
+                    processor_func.accepts_args,
+                    processor_func.traits,
+                    processor_func.input_types,
+                    processor_func.output_types,
+                )
+            )
         return commands
 
+    def infer_types(
+        self, pipeline_str: str, input_type: Optional[type] = None
+    ) -> List[Types]:
+        """
+        根据处理器的注解推断管道中各阶段的输出类型，input_type为管道输入的类型，None表示未知
+        返回的每一项为类型元组，None表示无法推断
+        """
+        value_types = (input_type,) if input_type is not None else None
+        stage_types = []
+        for command in self._get_pipeline(pipeline_str).commands:
+            # 多余的类型守卫不改变类型
+            if not _is_redundant_guard(command, value_types):
+                value_types = _stage_output_types(command, value_types)
+            stage_types.append(value_types)
+        return stage_types
+
+    def check_pipeline(self, pipeline_str: str, input_type: Optional[type] = None):
+        """
+        静态检查管道，若某一阶段的参数与处理器不匹配，或上一阶段输出的类型一定不能被该处理器接收，
+        抛出ProcessorTypeError，input_type为管道输入的类型，None表示未知
+        """
+        value_types = (input_type,) if input_type is not None else None
+        for i, command in enumerate(self._get_pipeline(pipeline_str).commands):
+            if command.accepts_args:
+                try:
+                    inspect.signature(command.func).bind(None, *command.args)
+                except TypeError as e:
+                    raise ProcessorTypeError(
+                        f"invalid arguments for stage ({i}) {command.name}: {e}"
+                    )
+                except ValueError:
+                    # 无法获取签名的函数，不检查参数
+                    pass
+            if not is_compatible(value_types, command.input_types):
+                raise ProcessorTypeError(
+                    f"stage ({i}) {command.name} expects {describe(command.input_types)}"
+                    f" input, got {describe(value_types)}"
+                )
+            value_types = command.output_types
+
     def execute(
-        self, pipeline_str: str, initial_input: Any = None, debug: bool = False
+        self,
+        pipeline_str: str,
+        initial_input: Any = None,
+        debug: bool = False,
+        streaming: bool = False,
+        variables: Optional[Dict[str, Any]] = None,
     ) -> Any:
-        """执行管道"""
+        """执行管道，streaming、variables参数的含义见compile()"""
         if debug:
-            return self.debug_execute(pipeline_str, initial_input)
-
-        commands = self.parse_processor(pipeline_str)
-        if not commands:
-            return initial_input
-
-        func = commands[0].func
-        args = commands[0].args or []
-
-        # 执行第一个命令
-        current_data = self._exec_func(func, initial_input, args)
-
-        # 执行后续命令
-        for command in commands[1:]:
-            func = command.func
-            args = command.args
-            current_data = self._exec_func(func, current_data, args)
-        return current_data
+            return self.debug_execute(pipeline_str, initial_input, variables)
+        if self._trace_hooks:
+            return self._execute_traced(pipeline_str, initial_input, variables)
+
+        return self.compile(pipeline_str, streaming, variables)(initial_input)
+
+    def execute_all(
+        self,
+        jobs: Iterable[Tuple],
+        streaming: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> Dict[Hashable, Any]:
+        """
+        批量执行管道，jobs为(键, 管道字符串, 初始输入)或(键, 管道字符串, 初始输入, 引用的值)，
+        返回键到结果的字典，其顺序与jobs一致
+        max_workers大于1时各管道并发执行，为None时使用构造执行器时指定的值，单个管道执行失败不影响其他管道，
+        全部执行完毕后，若存在失败项，则抛出ProcessorBatchError
+        """
+        results, errors = self._run_batch(list(jobs), streaming, max_workers)
+        if errors:
+            raise ProcessorBatchError(errors, results)
+        return results
+
+    def execute_many(
+        self,
+        pipeline_str: str,
+        inputs: Iterable[Any],
+        streaming: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        对多个输入执行同一管道，管道只解析、编译一次，返回与inputs顺序一致的结果列表
+        并发执行及错误处理的方式与execute_all()相同，ProcessorBatchError中的键为输入的索引
+        """
+        jobs = [(i, pipeline_str, data) for i, data in enumerate(inputs)]
+        results, errors = self._run_batch(jobs, streaming, max_workers)
+        if errors:
+            raise ProcessorBatchError(errors, results)
+        return list(results.values())
+
+    def _run_batch(
+        self,
+        jobs: List[Tuple],
+        streaming: bool,
+        max_workers: Optional[int],
+    ) -> Tuple[Dict[Hashable, Any], Dict[Hashable, BaseException]]:
+        if max_workers is None:
+            max_workers = self._max_workers
+        compiled: Dict[str, Callable[[Any], Any]] = {}
+
+        def _compiled(
+            pipeline_str: str, variables: Optional[Dict[str, Any]]
+        ) -> Callable[[Any], Any]:
+            if variables:
+                # 引用替换后的管道由compile()按引用的值缓存
+                return self.compile(pipeline_str, streaming, variables)
+            func = compiled.get(pipeline_str)
+            if func is None:
+                func = compiled[pipeline_str] = self.compile(pipeline_str, streaming)
+            return func
+
+        outcomes: Dict[Hashable, Tuple[bool, Any]] = {}
+        if max_workers <= 1 or len(jobs) <= 1:
+            for key, pipeline_str, initial_input, *rest in jobs:
+                variables = rest[0] if rest else None
+                try:
+                    func = _compiled(pipeline_str, variables)
+                    outcomes[key] = (True, func(initial_input))
+                except Exception as e:
+                    outcomes[key] = (False, e)
+        else:
+            pool = self._get_pool(max_workers)
+            futures = []
+            broken = False
+            for key, pipeline_str, initial_input, *rest in jobs:
+                variables = rest[0] if rest else None
+                if self._use_processes:
+                    task = (
+                        _execute_in_worker,
+                        pipeline_str,
+                        initial_input,
+                        streaming,
+                        variables,
+                    )
+                else:
+                    # 在当前线程中编译，工作线程只负责执行
+                    try:
+                        task = (_compiled(pipeline_str, variables), initial_input)
+                    except Exception as e:
+                        outcomes[key] = (False, e)
+                        continue
+                try:
+                    futures.append((key, pool.submit(*task)))
+                except BrokenExecutor as e:
+                    outcomes[key] = (False, e)
+                    broken = True
+            for key, future in futures:
+                try:
+                    outcomes[key] = (True, future.result())
+                except BrokenExecutor as e:
+                    outcomes[key] = (False, e)
+                    broken = True
+                except Exception as e:
+                    outcomes[key] = (False, e)
+            if broken:
+                # 工作进程异常退出后池不再可用，下一次并发执行时重新创建
+                self._discard_pool(pool)
+
+        results = {key: value for key, (ok, value) in outcomes.items() if ok}
+        errors = {key: value for key, (ok, value) in outcomes.items() if not ok}
+        return results, errors
+
+    def _get_pool(self, max_workers: int) -> Executor:
+        """返回可以复用的池，尚未创建或工作线程（进程）的数量不同时创建新的池"""
+        with self._pool_lock:
+            previous = None
+            if self._pool is not None and self._pool_workers != max_workers:
+                previous = self._pool
+                self._pool = None
+            if self._pool is None:
+                self._pool = self._create_pool(max_workers)
+                self._pool_workers = max_workers
+            pool = self._pool
+        if previous is not None:
+            # 已提交的任务仍会执行完毕，不必等待
+            previous.shutdown(wait=False)
+        return pool
+
+    def _discard_pool(self, pool: Optional[Executor] = None):
+        """丢弃当前的池（指定pool时，仅当其仍为当前的池），其中已提交的任务仍会执行完毕"""
+        with self._pool_lock:
+            if self._pool is None or (pool is not None and pool is not self._pool):
+                return
+            pool, self._pool = self._pool, None
+        pool.shutdown(wait=False)
+
+    def _create_pool(self, max_workers: int) -> Executor:
+        if not self._use_processes:
+            return ThreadPoolExecutor(max_workers=max_workers)
+        functions = [(name, f.func) for name, f in self._registry.items()]
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker_executor,
+            initargs=(
+                functions,
+                self._invalid_arg_handler,
+                self._cache_size,
+                self._memo_size,
+            ),
+        )
 
     @staticmethod
-    def _exec_func(func: Callable, input_data: Any, args: List[Any]) -> Any:
-        sig = inspect.signature(func)
-        params = list(sig.parameters.values())
-        if len(params) == 0:
-            raise InvalidProcessorFunction(f"at least one parameter is required")
-        if len(params) == 1:
-            return func(input_data)
-        return func(input_data, *args)
-
-    def debug_execute(self, pipeline_str: str, initial_input: Any = None) -> Any:
-        """执行管道并显示调试信息"""
-
-        def _args_str(arg):
-            if arg:
-                return "args = (" + ",".join(map(str, arg)) + ")"
-            return "args = <NoArgs>"
-
-        def _input_str(data):
-            return f"input = {data} (type:{type(data)})"
-
-        def _func_str(no, f):
-            return f"({no}) {f}".ljust(15)
-
-        def _output_str(data):
-            return f"output = {data} (type:{type(data)})"
-
-        def _proc_str(no, f, arg, ip, op):
-            return f"{_func_str(no, f)}  {_input_str(ip)}  {_args_str(arg)}  {_output_str(op)}"
-
-        commands = self.parse_processor(pipeline_str)
-        if not commands:
-            return initial_input
-
-        # 执行第一个命令
-        func = commands[0].func
-        args = commands[0].args
-        name = commands[0].name
-        current_data = self._exec_func(func, initial_input, args)
-        print(_proc_str(0, name, args, initial_input, current_data))
-        for i, command in enumerate(commands[1:], 1):
-            func = command.func
-            args = command.args
-            name = command.name
-            prev_data = current_data
-
-            current_data = self._exec_func(func, current_data, args)
-            print(_proc_str(i, name, args, prev_data, current_data))
-
-        return current_data
+    def _exec_command(command: Command, input_data: Any) -> Any:
+        if command.accepts_args:
+            return command.func(input_data, *command.args)
+        return command.func(input_data)
+
+    def add_trace_hook(self, hook: Callable[[PipelineTrace], None]):
+        """
+        添加跟踪钩子，存在钩子时，execute()及此后compile()返回的可调用对象会逐阶段执行管道，
+        并在每次执行结束后将PipelineTrace传递给各钩子（进程池中的执行不会被跟踪）
+        """
+        self._trace_hooks.append(hook)
+
+    def remove_trace_hook(self, hook: Callable[[PipelineTrace], None]):
+        self._trace_hooks.remove(hook)
+
+    def trace(
+        self,
+        pipeline_str: str,
+        initial_input: Any = None,
+        measure_memory: bool = False,
+        variables: Optional[Dict[str, Any]] = None,
+    ) -> PipelineTrace:
+        """
+        逐阶段执行管道并记录每个阶段的执行情况，处理器抛出的异常记录在返回值的error中，不会向外抛出
+        measure_memory为True且tracemalloc已启动时，同时记录每个阶段新分配内存的峰值
+        """
+        measure_memory = measure_memory and tracemalloc.is_tracing()
+        identity, pipeline = self._resolve_pipeline(pipeline_str, variables)
+        trace = PipelineTrace(pipeline=pipeline_str, input=initial_input)
+        start = time.perf_counter_ns()
+
+        memo_key = None
+        if (
+            self._memo_enabled
+            and identity is not None
+            and pipeline.commands
+            and pipeline.pure
+        ):
+            memo_key = _memo_key(identity, initial_input)
+        cached = _MISSING
+        if memo_key is not None:
+            cached = self._memo.get(memo_key, _MISSING)
+
+        if cached is not _MISSING:
+            trace.result = _copy_result(cached)
+            trace.memoized = True
+        else:
+            data = initial_input
+            try:
+                for i, command in enumerate(pipeline.commands):
+                    stage = StageRecord(i, command.name, tuple(command.args), data)
+                    trace.stages.append(stage)
+                    if measure_memory:
+                        memory_before = _reset_memory_peak()
+                    stage_start = time.perf_counter_ns()
+                    try:
+                        data = self._exec_command(command, data)
+                    finally:
+                        stage.elapsed_ns = time.perf_counter_ns() - stage_start
+                        if measure_memory:
+                            stage.allocated_bytes = _memory_allocated_since(
+                                memory_before
+                            )
+                    stage.output = data
+            except Exception as e:
+                trace.stages[-1].error = e
+                trace.error = e
+            else:
+                trace.result = data
+                if memo_key is not None:
+                    self._memo.put(memo_key, _copy_result(data))
+        trace.elapsed_ns = time.perf_counter_ns() - start
+
+        for hook in self._trace_hooks:
+            hook(trace)
+        return trace
+
+    def _execute_traced(
+        self,
+        pipeline_str: str,
+        initial_input: Any,
+        variables: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        trace = self.trace(pipeline_str, initial_input, variables=variables)
+        if trace.error is not None:
+            raise trace.error
+        return trace.result
+
+    def debug_execute(
+        self,
+        pipeline_str: str,
+        initial_input: Any = None,
+        variables: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """执行管道并显示各阶段的执行情况"""
+        trace = self.trace(pipeline_str, initial_input, variables=variables)
+        for line in trace.format_lines():
+            print(line)
+        if trace.error is not None:
+            raise trace.error
+        return trace.result
@@ -2,14 +2,23 @@ import os.path
 from pathlib import Path
 from typing import Any, Union, Callable, Optional, Dict
 
+from . import fscache, probes
+from .processor import ProcessorExecutor, get_processor_traits, processor_traits
+
 _BUILTINS = {}
 
 
 def _add_to_builtins(
-    func: Callable, name: Optional[str] = None, aliases: Optional[list] = None
+    func: Callable,
+    name: Optional[str] = None,
+    aliases: Optional[list] = None,
+    **traits: Any,
 ):
     global _BUILTINS
     name = name or func.__name__
+    # 内置处理器默认均为纯函数，依赖当前工作目录等外部状态的处理器须显式声明pure=False
+    traits.setdefault("pure", True)
+    processor_traits(func, **traits)
     _BUILTINS[name] = func
 
     if not aliases:
@@ -28,14 +37,17 @@ def ensure_type(input_data: Any, expected_type: str, failure_value: Any = "") ->
     return failure_value
 
 
-_add_to_builtins(ensure_type)
+_add_to_builtins(
+    ensure_type,
+    guarded_type=lambda expected_type, failure_value="": expected_type,
+)
 
 
 def ensure_str(input_data: Any, failure_value: str = "") -> str:
     return ensure_type(input_data, "str", failure_value)
 
 
-_add_to_builtins(ensure_str)
+_add_to_builtins(ensure_str, guarded_type=lambda failure_value="": "str")
 
 
 def to_str(input_data: Any) -> str:
@@ -135,7 +147,9 @@ def rstrip(input_data: str, chars: str = None) -> str:
 _add_to_builtins(rstrip)
 
 
-def strslice(input_data: str, start: int, end: int = None):
+def strslice(
+    input_data: Union[str, list], start: int, end: int = None
+) -> Union[str, list]:
     return input_data[start:end]
 
 
@@ -146,7 +160,7 @@ def join(input_data: list, separator: str = " ") -> str:
     return separator.join(input_data)
 
 
-_add_to_builtins(join)
+_add_to_builtins(join, accepts_iterable=True)
 
 
 def prefix(input_data: str, pre: str) -> str:
@@ -175,42 +189,79 @@ def reverse(input_data: Union[str, list]) -> Union[str, list]:
 _add_to_builtins(reverse)
 
 
-def left(input_data: str, length: int) -> str:
+def left(input_data: Union[str, list], length: int) -> Union[str, list]:
     return input_data[:length]
 
 
 _add_to_builtins(left)
 
 
-def right(input_data: str, length: int) -> str:
+def right(input_data: Union[str, list], length: int) -> Union[str, list]:
     return input_data[-length:]
 
 
 _add_to_builtins(right)
 
 
-def ifelse(condition: bool, true_value: Any, false_value: Any) -> Any:
+def ifelse(condition: Any, true_value: Any, false_value: Any) -> Any:
     return true_value if condition else false_value
 
 
 _add_to_builtins(ifelse)
 
 
-def distinct(input_data: list) -> list:
-    return list(set(input_data))
+def distinct(input_data: list, keep_order: bool = True) -> list:
+    if not keep_order:
+        return list(set(input_data))
+    # dict保持插入顺序，重复项保留第一次出现的位置
+    return list(dict.fromkeys(input_data))
+
+
+_add_to_builtins(distinct, accepts_iterable=True)
+
+
+def _key_function(key: str) -> Callable:
+    key_func = _BUILTINS.get(key)
+    if key_func is None:
+        raise ValueError(f"unknown key processor: {key}")
+    # distinct_by被声明为纯函数，其结果只能取决于输入，因此不接受依赖外部状态的处理器（如asbpath）
+    if not get_processor_traits(key_func).pure:
+        raise ValueError(f"key processor must be pure: {key}")
+    return key_func
+
+
+def distinct_by(input_data: list, key: str) -> list:
+    """按key指定的内置处理器（如normpath、lower）的结果去重，保留第一次出现的元素"""
+    key_func = _key_function(key)
+    seen = set()
+    ret = []
+    for x in input_data:
+        k = key_func(x)
+        if k not in seen:
+            seen.add(k)
+            ret.append(x)
+    return ret
+
+
+_add_to_builtins(distinct_by, accepts_iterable=True)
+
+
+def dedupe_keep_last(input_data: list) -> list:
+    """去重并保留最后一次出现的位置，适用于链接库等后出现者优先的列表"""
+    return list(reversed(dict.fromkeys(reversed(list(input_data)))))
 
 
-_add_to_builtins(distinct)
+_add_to_builtins(dedupe_keep_last, accepts_iterable=True)
 
 
 def no_empty(input_data: list) -> list:
     return [x for x in input_data if x]
 
 
-_add_to_builtins(no_empty)
+_add_to_builtins(no_empty, item_predicate=bool, item_template="{x}")
 
 
-def ifeq(input_data: Any, value: Any, true_value: Any, *args: Any):
+def ifeq(input_data: Any, value: Any, true_value: Any, *args: Any) -> Any:
     if input_data == value:
         return true_value
     if args:
@@ -221,7 +272,7 @@ def ifeq(input_data: Any, value: Any, true_value: Any, *args: Any):
 _add_to_builtins(ifeq)
 
 
-def ifneq(input_data: Any, value: Any, true_value: Any, *args: Any):
+def ifneq(input_data: Any, value: Any, true_value: Any, *args: Any) -> Any:
     if input_data != value:
         return true_value
     if args:
@@ -268,32 +319,48 @@ def suffix_ifneq(input_data: str, value: str, suffix_: str) -> str:
 _add_to_builtins(suffix_ifneq)
 
 
-def prefix_each(input_data: list, prefix_: str):
+def prefix_each(input_data: list, prefix_: str) -> list:
     return [prefix_ + x for x in input_data]
 
 
-_add_to_builtins(prefix_each)
+_add_to_builtins(
+    prefix_each,
+    item_mapper=lambda x, prefix_: prefix_ + x,
+    item_template="{0} + {x}",
+)
 
 
-def suffix_each(input_data: list, suffix_: str):
+def suffix_each(input_data: list, suffix_: str) -> list:
     return [x + suffix_ for x in input_data]
 
 
-_add_to_builtins(suffix_each)
+_add_to_builtins(
+    suffix_each,
+    item_mapper=lambda x, suffix_: x + suffix_,
+    item_template="{x} + {0}",
+)
 
 
-def replace_each(input_data: list, old: str, new: str):
+def replace_each(input_data: list, old: str, new: str) -> list:
     return [x.replace(old, new) for x in input_data]
 
 
-_add_to_builtins(replace_each)
+_add_to_builtins(
+    replace_each,
+    item_mapper=lambda x, old, new: x.replace(old, new),
+    item_template="{x}.replace({0}, {1})",
+)
 
 
-def strip_each(input_data: list, chars: str = None):
+def strip_each(input_data: list, chars: str = None) -> list:
     return [x.strip(chars) for x in input_data]
 
 
-_add_to_builtins(strip_each)
+_add_to_builtins(
+    strip_each,
+    item_mapper=lambda x, chars=None: x.strip(chars),
+    item_template="{x}.strip({args})",
+)
 
 
 def asbpath(input_data: str) -> str:
@@ -302,7 +369,7 @@ def asbpath(input_data: str) -> str:
     return os.path.abspath(input_data)
 
 
-_add_to_builtins(asbpath)
+_add_to_builtins(asbpath, pure=False)
 
 
 def normpath(input_data: str) -> str:
@@ -314,10 +381,44 @@ def normpath(input_data: str) -> str:
 _add_to_builtins(normpath)
 
 
+def _is_clean_posix(path: str) -> bool:
+    """路径非空，且不包含空的部分、"."及".."，即已经是规范形式（不以"."开头的名称均不会被误判）"""
+    return (
+        bool(path)
+        and "//" not in path
+        and "/." not in path
+        and not path.startswith(".")
+        and not path.endswith("/")
+    )
+
+
+def _as_posix_str(path: str) -> str:
+    """
+    与Path(path).as_posix()等价（POSIX系统），但只进行字符串操作，不创建Path对象：
+    去除多余的"/"及"."，路径为空时返回"."，开头恰好为两个"/"时保留（POSIX规定其含义由实现定义）
+    """
+    if _is_clean_posix(path):
+        return path
+    if path.startswith("/"):
+        root = "//" if path.startswith("//") and not path.startswith("///") else "/"
+    else:
+        root = ""
+    parts = [part for part in path.split("/") if part and part != "."]
+    return root + "/".join(parts) if root else "/".join(parts) or "."
+
+
+def _as_posix_path(path: str) -> str:
+    return Path(path).as_posix()
+
+
+# Windows下的路径包含盘符、反斜杠等，交由pathlib处理
+_as_posix = _as_posix_str if os.name == "posix" else _as_posix_path
+
+
 def posixpath(input_data: str) -> str:
     if not input_data or not input_data.strip():
         return ""
-    return Path(input_data).as_posix()
+    return _as_posix(input_data)
 
 
 _add_to_builtins(posixpath)
@@ -326,10 +427,26 @@ _add_to_builtins(posixpath)
 def abspath_each(input_data: list) -> list:
     if not input_data:
         return []
-    return [os.path.abspath(x) for x in input_data]
-
-
-_add_to_builtins(abspath_each)
+    if os.name != "posix":
+        return [os.path.abspath(x) for x in input_data]
+    # os.path.abspath()每次调用都会获取当前工作目录，批量处理时只获取一次，
+    # 且已经是规范形式的路径直接拼接，不再调用os.path.normpath()
+    cwd = os.getcwd()
+    prefix_ = cwd.rstrip("/") + "/"
+    join = os.path.join
+    normpath_ = os.path.normpath
+    return [
+        (
+            (x if x.startswith("/") else prefix_ + x)
+            if _is_clean_posix(x)
+            else normpath_(x if x.startswith("/") else join(cwd, x))
+        )
+        for x in input_data
+    ]
+
+
+# 不声明item_mapper，以免合并为逐元素调用os.path.abspath()的循环
+_add_to_builtins(abspath_each, accepts_iterable=True, pure=False)
 
 
 def normpath_each(input_data: list) -> list:
@@ -338,16 +455,17 @@ def normpath_each(input_data: list) -> list:
     return [os.path.normpath(x) for x in input_data]
 
 
-_add_to_builtins(normpath_each)
+_add_to_builtins(normpath_each, item_mapper=os.path.normpath)
 
 
 def posixpath_each(input_data: list) -> list:
     if not input_data:
         return []
-    return [Path(x).as_posix() for x in input_data]
+    as_posix = _as_posix
+    return [as_posix(x) for x in input_data]
 
 
-_add_to_builtins(posixpath_each)
+_add_to_builtins(posixpath_each, item_mapper=_as_posix)
 
 
 def pretend_each(input_data: list, value: Any) -> list:
@@ -358,7 +476,7 @@ def pretend_each(input_data: list, value: Any) -> list:
     return ret
 
 
-_add_to_builtins(pretend_each)
+_add_to_builtins(pretend_each, accepts_iterable=True)
 
 
 def extend_each(input_data: list, value: Any) -> list:
@@ -369,7 +487,107 @@ def extend_each(input_data: list, value: Any) -> list:
     return ret
 
 
-_add_to_builtins(extend_each)
+_add_to_builtins(extend_each, accepts_iterable=True)
+
+
+def _roots(input_data: Union[str, list]) -> list:
+    if isinstance(input_data, str):
+        return [input_data]
+    return list(input_data or [])
+
+
+def _join_rel(root: str, rel: str) -> str:
+    if not root or root == ".":
+        return rel
+    if root.endswith(("/", os.sep)):
+        return root + rel
+    return root + "/" + rel
+
+
+def _glob_roots(input_data: Union[str, list], pattern: str) -> list:
+    # 多个目录或"**"可能匹配到同一文件，去除重复项并保持顺序
+    found = {}
+    for root in _roots(input_data):
+        root = root.strip()
+        for rel in fscache.iglob(root, pattern):
+            found[_join_rel(root, rel)] = None
+    return list(found)
+
+
+def glob(input_data: Union[str, list], pattern: str) -> list:
+    return _glob_roots(input_data, pattern)
+
+
+_add_to_builtins(glob, pure=False)
+
+
+def rglob(input_data: Union[str, list], pattern: str) -> list:
+    return _glob_roots(input_data, "**/" + pattern)
+
+
+_add_to_builtins(rglob, pure=False)
+
+
+DEFAULT_SOURCE_EXTENSIONS = (".c", ".cc", ".cpp", ".cxx", ".s", ".S")
+
+
+def list_sources(input_data: Union[str, list], *extensions: str) -> list:
+    extensions = tuple(
+        ext if ext.startswith(".") else "." + ext
+        for ext in (extensions or DEFAULT_SOURCE_EXTENSIONS)
+    )
+    return [x for x in _glob_roots(input_data, "**") if x.endswith(extensions)]
+
+
+_add_to_builtins(list_sources, pure=False)
+
+
+def _exists(path: str) -> bool:
+    return bool(path) and fscache.get_scandir_cache().contains(path)
+
+
+def filter_exists(input_data: list) -> list:
+    return [x for x in input_data if _exists(x)]
+
+
+_add_to_builtins(filter_exists, item_predicate=_exists, pure=False)
+
+
+def _package_list(packages: Union[str, list]) -> list:
+    if isinstance(packages, str):
+        return packages.split()
+    return [x for x in packages if x]
+
+
+def pkg_config_cflags(input_data: Union[str, list], packages: Any = None) -> str:
+    """packages未指定时，以输入作为包名（以空白分隔的字符串或列表）"""
+    return probes.pkg_config(_package_list(packages or input_data), "--cflags")
+
+
+_add_to_builtins(pkg_config_cflags, pure=False)
+
+
+def pkg_config_libs(input_data: Union[str, list], packages: Any = None) -> str:
+    return probes.pkg_config(_package_list(packages or input_data), "--libs")
+
+
+_add_to_builtins(pkg_config_libs, pure=False)
+
+
+def find_program(input_data: str, name: str = None) -> str:
+    """返回程序的绝对路径，找不到时返回空字符串，name未指定时以输入作为程序名"""
+    return probes.find_program((name or input_data or "").strip())
+
+
+_add_to_builtins(find_program, pure=False)
+
+
+def compiler_supports_flag(input_data: str, flag: str) -> bool:
+    """输入为编译器（如CC变量的值），判断其是否支持flag"""
+    return probes.compiler_supports_flag(input_data.strip(), flag)
+
+
+_add_to_builtins(compiler_supports_flag, pure=False)
 
 
 def get_builtins() -> Dict[str, Callable]:
@@ -378,3 +596,11 @@ def get_builtins() -> Dict[str, Callable]:
 
 def get_builtin_processor(name: str) -> Optional[Callable]:
     return _BUILTINS.get(name, None)
+
+
+def create_processor_executor(**kwargs) -> ProcessorExecutor:
+    # kwargs会传递给ProcessorExecutor，如max_workers、use_processes等
+    executor = ProcessorExecutor(**kwargs)
+    for processor_name, processor_func in _BUILTINS.items():
+        executor.register(func=processor_func, name=processor_name)
+    return executor
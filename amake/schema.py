@@ -1,13 +1,27 @@
+import copy
 import dataclasses
 import time
-from typing import List, Dict, Union, Any, Optional, Iterable, Tuple
+import weakref
+from typing import List, Dict, Union, Any, Optional, Iterable, Tuple, Set
 
 from pyguiadapterlite import BaseParameterWidgetConfig
 
-from .common import VariableTypes, Serializable
+from .common import VariableTypes, Serializable, strictly_equal
 from .makeoptions import MakeOptions
-from .processor import ProcessorExecutor
-from .variable import analyze_variable, KEY_VAR_TYPE, KEY_VAR_PROC
+from .processor import (
+    ProcessorExecutor,
+    ProcessorError,
+    ProcessorTypeError,
+    ProcessorBatchError,
+    find_references,
+)
+from .variable import (
+    CircularVariableReference,
+    analyze_variable,
+    variable_value_type,
+    KEY_VAR_TYPE,
+    KEY_VAR_PROC,
+)
 
 CLASSIC_VARIABLES_DEF = {
     "BINARY": {
@@ -150,6 +164,14 @@ class AmakeSchema(Serializable):
         self._parameter_configs: Optional[Dict[str, BaseParameterWidgetConfig]] = {}
         self._variable_processors: Optional[Dict[str, str]] = {}
         self._variable_typenames: Optional[Dict[str, str]] = {}
+        # 各变量的处理器中以${NAME}形式引用的其他变量
+        self._variable_references: Dict[str, Set[str]] = {}
+        # 按依赖关系分层的变量，每一层只依赖此前各层的变量
+        self._evaluation_levels: List[List[str]] = []
+        # 各变量默认值及其处理结果，只对纯函数管道计算，基于某一执行器及其注册表的版本
+        self._processed_defaults: Dict[str, Tuple[Any, Any]] = {}
+        self._processed_defaults_executor: Optional[weakref.ref] = None
+        self._processed_defaults_generation = -1
 
         self._update()
 
@@ -170,6 +192,28 @@ class AmakeSchema(Serializable):
             return None
         return conf.default_value
 
+    def references_of(self, variable_name: str) -> Set[str]:
+        """返回变量的处理器所引用的其他变量"""
+        return set(self._variable_references.get(variable_name, ()))
+
+    def dependents_of(self, variable_names: Iterable[str]) -> Set[str]:
+        """返回直接或间接引用了variable_names中任一变量的变量，不包括variable_names本身"""
+        changed = set(variable_names)
+        dependents = set()
+        # 按层的顺序遍历，被引用的变量总是先于引用它的变量
+        for level in self._evaluation_levels:
+            for var_name in level:
+                if var_name in changed:
+                    continue
+                if self._variable_references.get(var_name, set()) & changed:
+                    changed.add(var_name)
+                    dependents.add(var_name)
+        return dependents
+
+    @property
+    def evaluation_levels(self) -> List[List[str]]:
+        return [list(level) for level in self._evaluation_levels]
+
     def has_variable(self, variable_name: str) -> bool:
         return variable_name in self._parameter_configs
 
@@ -180,30 +224,290 @@ class AmakeSchema(Serializable):
                 conflicts.append(name)
         return conflicts
 
+    def check_processors(self, executor: ProcessorExecutor):
+        """
+        根据各变量的类型（__type__）静态检查其处理器，处理器不存在、参数不匹配或类型一定不匹配时，
+        抛出ProcessorTypeError，其中列出全部有问题的变量
+        """
+        errors = []
+        for var_name, processor in self._variable_processors.items():
+            if not processor:
+                continue
+            value_type = variable_value_type(self._variable_typenames[var_name])
+            try:
+                executor.check_pipeline(processor, value_type)
+            except ProcessorError as e:
+                errors.append(f"{var_name}: {e}")
+        if errors:
+            raise ProcessorTypeError(
+                f"invalid processors in schema: {'; '.join(errors)}"
+            )
+
+    def precompute_defaults(self, executor: ProcessorExecutor):
+        """
+        预先计算各变量默认值的处理结果，此后值与默认值严格相等的变量将直接使用该结果，不再执行处理器
+        未调用此方法时，将在首次处理变量时计算
+        """
+        self._get_processed_defaults(executor)
+
+    def _get_processed_defaults(
+        self, executor: ProcessorExecutor
+    ) -> Dict[str, Tuple[Any, Any]]:
+        """
+        返回各变量的(默认值, 处理结果)，执行器或其注册表发生变化时重新计算
+        依赖外部状态（非纯函数）的管道及默认值处理失败的变量不进行预计算
+        """
+        if (
+            self._processed_defaults_executor is not None
+            and self._processed_defaults_executor() is executor
+            and self._processed_defaults_generation == executor.registry_generation
+        ):
+            return self._processed_defaults
+
+        processed_defaults = {}
+        for var_name, processor in self._variable_processors.items():
+            # 引用了其他变量的处理器，其结果还取决于被引用变量的值
+            if not processor or var_name in self._variable_references:
+                continue
+            try:
+                if not executor.is_pure(processor):
+                    continue
+                default_value = copy.deepcopy(self.default_value_of(var_name))
+                result = executor.compile(processor)(copy.deepcopy(default_value))
+            except Exception:
+                continue
+            processed_defaults[var_name] = (default_value, result)
+        self._processed_defaults = processed_defaults
+        self._processed_defaults_executor = weakref.ref(executor)
+        self._processed_defaults_generation = executor.registry_generation
+        return processed_defaults
+
+    def _make_jobs(
+        self,
+        executor: ProcessorExecutor,
+        variables: Dict[str, Any],
+        processed: Dict[str, Any],
+        key_prefix: Tuple = (),
+        context: Optional[Dict[str, Any]] = None,
+        folded_names: Optional[Set[str]] = None,
+    ) -> List[Tuple]:
+        """
+        为需要执行处理器的变量生成execute_all()的任务，值与默认值严格相等的变量直接使用预先计算的结果，
+        放入processed中，其名称同时加入folded_names（若指定）；
+        引用了其他变量的处理器，从context中取得被引用变量处理后的值
+        """
+        processed_defaults = self._get_processed_defaults(executor)
+        jobs = []
+        for var_name, var_val in variables.items():
+            processor = self.processor_of(var_name)
+            if not processor:
+                continue
+            folded = processed_defaults.get(var_name)
+            if folded is not None and strictly_equal(var_val, folded[0]):
+                processed[var_name] = copy.deepcopy(folded[1])
+                if folded_names is not None:
+                    folded_names.add(var_name)
+                continue
+            key = key_prefix + (var_name,) if key_prefix else var_name
+            references = self._variable_references.get(var_name)
+            if references and context is not None:
+                jobs.append(
+                    (
+                        key,
+                        processor,
+                        var_val,
+                        {name: context[name] for name in references if name in context},
+                    )
+                )
+            else:
+                jobs.append((key, processor, var_val))
+        return jobs
+
     def run_processor_on(
         self,
         executor: ProcessorExecutor,
         variable_name: str,
         initial_value: Any,
         debug: bool = False,
+        streaming: bool = False,
+        context: Optional[Dict[str, Any]] = None,
     ) -> Any:
+        """context为被引用变量处理后的值"""
         processor = self.processor_of(variable_name)
         if not processor:
             return initial_value
-        return executor.execute(processor, initial_value, debug)
+        if not debug:
+            folded = self._get_processed_defaults(executor).get(variable_name)
+            if folded is not None and strictly_equal(initial_value, folded[0]):
+                return copy.deepcopy(folded[1])
+        return executor.execute(processor, initial_value, debug, streaming, context)
 
     def get_processed_values(
         self,
         executor: ProcessorExecutor,
         variables: Dict[str, Any],
         debug: bool = False,
+        streaming: bool = False,
+        resolved: Optional[Dict[str, Any]] = None,
+        folded_names: Optional[Set[str]] = None,
     ) -> Dict[str, Any]:
-        processed = {}
-        for var_name, var_val in variables.items():
-            processor = self.processor_of(var_name)
-            if processor:
-                var_val = executor.execute(processor, var_val, debug)
-            processed[var_name] = var_val
+        """
+        对各变量执行其处理器，返回的字典与variables顺序一致
+        非调试模式下，各变量交由executor.execute_all()批量执行（可能并发执行），
+        部分变量处理失败时抛出ProcessorBatchError，其中包含全部失败的变量
+        处理器引用了其他变量时，按依赖关系逐层求值，同一层中的变量互不依赖，仍然批量执行；
+        被引用的变量不在variables中时，使用resolved中已处理的值，仍不存在时处理其默认值
+        指定folded_names时，直接使用预先计算的默认值处理结果（未执行处理器）的变量名将被加入其中
+        """
+        if self._variable_references:
+            return self._get_processed_values_in_order(
+                executor, variables, debug, streaming, resolved or {}, folded_names
+            )
+        if debug:
+            processed = {}
+            for var_name, var_val in variables.items():
+                processor = self.processor_of(var_name)
+                if processor:
+                    var_val = executor.execute(processor, var_val, debug)
+                processed[var_name] = var_val
+            return processed
+
+        folded = {}
+        jobs = self._make_jobs(executor, variables, folded, folded_names=folded_names)
+        results = executor.execute_all(jobs, streaming)
+        results.update(folded)
+        return {
+            var_name: results.get(var_name, var_val)
+            for var_name, var_val in variables.items()
+        }
+
+    def get_processed_values_many(
+        self,
+        executor: ProcessorExecutor,
+        variables_list: List[Dict[str, Any]],
+        streaming: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        对多组变量（如不同平台、不同变体的配置）执行处理器，同一处理器在整个批次中只编译一次，
+        失败时抛出ProcessorBatchError，其中的键为(配置索引, 变量名)
+        """
+        if self._variable_references:
+            return self._get_processed_values_many_in_order(
+                executor, variables_list, streaming
+            )
+        jobs = []
+        folded_list = []
+        for i, variables in enumerate(variables_list):
+            folded = {}
+            jobs.extend(self._make_jobs(executor, variables, folded, (i,)))
+            folded_list.append(folded)
+        results = executor.execute_all(jobs, streaming)
+        processed_list = []
+        for i, variables in enumerate(variables_list):
+            folded = folded_list[i]
+            processed_list.append(
+                {
+                    var_name: folded.get(var_name, results.get((i, var_name), var_val))
+                    for var_name, var_val in variables.items()
+                }
+            )
+        return processed_list
+
+    def _get_processed_values_many_in_order(
+        self,
+        executor: ProcessorExecutor,
+        variables_list: List[Dict[str, Any]],
+        streaming: bool,
+    ) -> List[Dict[str, Any]]:
+        # 各组变量的引用互相独立，逐组求值
+        processed_list = []
+        errors = {}
+        results = {}
+        for i, variables in enumerate(variables_list):
+            try:
+                processed = self.get_processed_values(
+                    executor, variables, streaming=streaming
+                )
+            except ProcessorBatchError as e:
+                errors.update({(i, name): error for name, error in e.errors.items()})
+                processed = e.results
+            results.update({(i, name): value for name, value in processed.items()})
+            processed_list.append(processed)
+        if errors:
+            raise ProcessorBatchError(errors, results)
+        return processed_list
+
+    def _get_processed_values_in_order(
+        self,
+        executor: ProcessorExecutor,
+        variables: Dict[str, Any],
+        debug: bool,
+        streaming: bool,
+        resolved: Dict[str, Any],
+        folded_names: Optional[Set[str]] = None,
+    ) -> Dict[str, Any]:
+        # 补全variables中缺少的、被直接或间接引用的变量
+        inputs = dict(variables)
+        pending = list(variables)
+        while pending:
+            for name in self._variable_references.get(pending.pop(), ()):
+                if name not in inputs and name not in resolved:
+                    inputs[name] = copy.deepcopy(self.default_value_of(name))
+                    pending.append(name)
+
+        context = dict(resolved)
+        errors = {}
+        for level in self._evaluation_levels:
+            level_inputs = {}
+            for var_name in level:
+                if var_name not in inputs:
+                    continue
+                failed = [
+                    name
+                    for name in self._variable_references.get(var_name, ())
+                    if name in errors
+                ]
+                if failed:
+                    errors[var_name] = ProcessorError(
+                        f"referenced variable failed: {', '.join(sorted(failed))}"
+                    )
+                    continue
+                level_inputs[var_name] = inputs[var_name]
+            if debug:
+                for var_name, var_val in level_inputs.items():
+                    context[var_name] = self.run_processor_on(
+                        executor, var_name, var_val, True, streaming, context
+                    )
+                continue
+            results = {}
+            level_folded = set()
+            jobs = self._make_jobs(
+                executor,
+                level_inputs,
+                results,
+                context=context,
+                folded_names=level_folded,
+            )
+            try:
+                results.update(executor.execute_all(jobs, streaming))
+            except ProcessorBatchError as e:
+                results.update(e.results)
+                errors.update(e.errors)
+            for var_name, var_val in level_inputs.items():
+                if var_name not in errors:
+                    context[var_name] = results.get(var_name, var_val)
+            if folded_names is not None:
+                # 只报告variables中的变量，为求值而补全的被引用变量不计入
+                folded_names.update(name for name in level_folded if name in variables)
+
+        errors = {name: e for name, e in errors.items() if name in variables}
+        processed = {
+            var_name: context[var_name]
+            for var_name in variables
+            if var_name in context and var_name not in errors
+        }
+        if errors:
+            raise ProcessorBatchError(errors, processed)
         return processed
 
     @classmethod
@@ -255,11 +559,43 @@ class AmakeSchema(Serializable):
 
     def _update(self):
         self._parameter_configs.clear()
+        self._processed_defaults_executor = None
         for varname, var_def in self.variables.items():
             variable = analyze_variable(var_def)
             self._parameter_configs[varname] = variable.parameter_config
             self._variable_processors[varname] = variable.processor
             self._variable_typenames[varname] = variable.typename
+        self._update_references()
+
+    def _update_references(self):
+        """
+        根据处理器中的${NAME}引用建立变量之间的依赖关系，并按依赖关系将变量分层，
+        存在循环引用时抛出CircularVariableReference；引用的名称不是本模式中的变量时，保持原样
+        """
+        self._variable_references = {}
+        for varname in self._parameter_configs:
+            processor = self.processor_of(varname)
+            references = find_references(processor) & self._parameter_configs.keys()
+            if references:
+                self._variable_references[varname] = set(references)
+
+        levels = []
+        remaining = [name for name in self._parameter_configs]
+        evaluated = set()
+        while remaining:
+            level = [
+                name
+                for name in remaining
+                if self._variable_references.get(name, set()) <= evaluated
+            ]
+            if not level:
+                raise CircularVariableReference(
+                    f"circular variable reference among: {', '.join(remaining)}"
+                )
+            levels.append(level)
+            evaluated.update(level)
+            remaining = [name for name in remaining if name not in evaluated]
+        self._evaluation_levels = levels
 
 
 @dataclasses.dataclass
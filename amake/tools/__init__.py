@@ -2,4 +2,6 @@ from ._edit import edit_amake_schema
 from ._init import init_amake_schema, init_amake_config
 from ._process import run_processors
 from ._generate import generate_build_script
+from ._errors import show_build_errors
+from ._run import run_make
 from ._main import amake_main
@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Optional, Union
+
+from .common import curdir, _error
+
+DEFAULT_CONTEXT_LINES = 8
+
+
+def show_build_errors(
+    current_dir: Union[str, Path, None] = None,
+    log_file: Optional[str] = None,
+    nth: Optional[int] = None,
+    include_warnings: bool = False,
+    context_lines: int = DEFAULT_CONTEXT_LINES,
+) -> int:
+    from .. import buildlog
+
+    current_dir = curdir(current_dir)
+    if not log_file:
+        log_file = buildlog.latest_log(buildlog.project_log_dir(str(current_dir)))
+        if not log_file:
+            print("No build log found.")
+            return -1
+    else:
+        log_file = (current_dir / log_file).as_posix()
+
+    diagnostics = buildlog.load_index(log_file)
+    if not include_warnings:
+        diagnostics = [d for d in diagnostics if buildlog.is_error(d)]
+    kind = "diagnostics" if include_warnings else "errors"
+    print(f"{log_file}: {len(diagnostics)} {kind}")
+    if not diagnostics:
+        return 0
+
+    if nth is None:
+        for i, diagnostic in enumerate(diagnostics, start=1):
+            print(f"[{i}] {diagnostic.format()}")
+        return 0
+
+    if nth < 1 or nth > len(diagnostics):
+        print(f"No such error: {nth} (1-{len(diagnostics)})")
+        return -1
+    diagnostic = diagnostics[nth - 1]
+    try:
+        lines = buildlog.read_lines_at(log_file, diagnostic.offset, context_lines)
+    except OSError as e:
+        _error(f"Failed to read build log: {e}")
+        print(f"Failed to read build log: {e}")
+        return -1
+    print(f"[{nth}/{len(diagnostics)}]")
+    for line in lines:
+        print(line)
+    return 0
@@ -12,6 +12,7 @@ def generate_build_script(
     current_dir: Union[str, Path, None] = None,
     output_file: Union[str, Path, None] = None,
     no_confirm: bool = False,
+    refresh_probes: bool = False,
 ) -> int:
     schema_file = get_schema_file(current_dir, schema_file)
     if not schema_file:
@@ -41,7 +42,13 @@ def generate_build_script(
                 return -1
 
     from ..schema import AmakeSchema, AmakeConfigurations
-    from ..core import Amake, AmakeCommand
+    from ..core import AmakeCommand
+    from ..processors import create_processor_executor
+
+    if refresh_probes:
+        from ..probes import refresh_probes as _refresh_probes
+
+        _refresh_probes()
 
     try:
         schema = AmakeSchema.load(schema_file)
@@ -56,7 +63,8 @@ def generate_build_script(
         print(f"Failed to load config file: {e}")
         return -1
     try:
-        executor = Amake.create_processor_executor()
+        executor = create_processor_executor()
+        schema.check_processors(executor)
         command = AmakeCommand(
             configurations=config, schema=schema, processor_executor=executor
         )
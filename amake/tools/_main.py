@@ -62,6 +62,14 @@ def amake_main(
 
     from ..core import Amake
 
+    try:
+        schema.check_processors(Amake.create_processor_executor())
+    except Exception as e:
+        _error(f"Invalid processors in schema file: {schema_file} : {e}")
+        print(f"Invalid processors in schema file: {schema_file} : {e}")
+        show_error_message(f"Invalid processors in '{schema_file}' : {e}")
+        return -1
+
     try:
         app = Amake(get_appsettings(), schema, config)
         app.run()
@@ -1,3 +1,4 @@
+import tracemalloc
 from pathlib import Path
 from typing import Optional, Union, List
 
@@ -10,6 +11,10 @@ def run_processors(
     config_file: Optional[str] = None,
     current_dir: Union[str, Path, None] = None,
     variables: Optional[List[str]] = None,
+    trace_file: Optional[str] = None,
+    profile: bool = False,
+    refresh_probes: bool = False,
+    memo_size: int = 0,
 ):
     schema_file = get_schema_file(current_dir, schema_file)
     if not schema_file:
@@ -46,15 +51,62 @@ def run_processors(
         variables = list(schema.variables.keys())
         print("Variables".ljust(15), ":", "all")
 
-    from amake.core import Amake
+    from amake.processors import create_processor_executor
 
-    executor = Amake.create_processor_executor()
+    if refresh_probes:
+        from amake.probes import refresh_probes as _refresh_probes
+
+        _refresh_probes()
+
+    if profile and memo_size > 0:
+        # 性能分析时禁用记忆化，否则命中的管道不会真正执行
+        print("Memo".ljust(15), ":", "Disabled (--profile)")
+        memo_size = 0
+    executor = create_processor_executor(memo_size=max(memo_size, 0))
+
+    try:
+        schema.check_processors(executor)
+    except Exception as e:
+        _error(f"Invalid processors in schema file: {e}")
+        print(f"Invalid processors in schema file: {e}")
+        return -1
 
     flag_not_found = object()
 
+    def _value_of(name: str):
+        value = config.variables.get(name, flag_not_found)
+        if value is flag_not_found:
+            value = schema.default_value_of(name)
+        return value
+
+    # 先求出被引用变量处理后的值，以替换处理器中的${NAME}
+    referenced = {}
+    pending = [name for name in variables if schema.has_variable(name)]
+    while pending:
+        for name in schema.references_of(pending.pop()):
+            if name not in referenced:
+                referenced[name] = _value_of(name)
+                pending.append(name)
+    context = {}
+    if referenced:
+        from amake.processor import ProcessorBatchError
+
+        try:
+            context = schema.get_processed_values(executor, referenced)
+        except ProcessorBatchError as e:
+            context = e.results
+
     print()
 
+    from amake.tracing import TraceProfile
+
+    trace_profile = TraceProfile()
+    start_tracemalloc = profile and not tracemalloc.is_tracing()
+    if start_tracemalloc:
+        tracemalloc.start()
+
     failed_variables = []
+    traces = []
     for var_name in variables:
         print(f"Variable Name".ljust(15), ":", var_name)
         if not schema.has_variable(var_name):
@@ -62,9 +114,7 @@ def run_processors(
             print()
             continue
 
-        var_value = config.variables.get(var_name, flag_not_found)
-        if var_value is flag_not_found:
-            var_value = schema.default_value_of(var_name)
+        var_value = _value_of(var_name)
 
         processors = schema.processor_of(var_name)
         print(f"Initial Value".ljust(15), ":", var_value, f" (type: {type(var_value)})")
@@ -73,27 +123,59 @@ def run_processors(
             continue
 
         print("Run Processors".ljust(15), ":")
-        try:
-            print("*" * 80)
-            final_value = schema.run_processor_on(
-                executor, var_name, var_value, debug=True
-            )
+        print("*" * 80)
+        trace = executor.trace(
+            processors, var_value, measure_memory=profile, variables=context
+        )
+        for line in trace.format_lines():
+            print(line)
+        print("*" * 80)
+        traces.append((var_name, trace))
+        if profile:
+            trace_profile.add(var_name, trace)
+            print("Profile".ljust(15), ":")
+            for line in trace_profile.format_stage_lines(var_name):
+                print(line)
             print("*" * 80)
+        if trace.error is not None:
+            _error(f"Error processing variable {var_name}: {trace.error}")
+            print("Error:".ljust(15), ":", f"{trace.error}")
+            failed_variables.append(var_name)
+        else:
             print(
                 f"Final Value".ljust(15),
                 ":",
-                final_value,
-                f" (type: {type(final_value)})",
+                trace.result,
+                f" (type: {type(trace.result)})",
             )
-        except Exception as e:
-            _error(f"Error processing variable {var_name}: {e}")
-            print("Error:".ljust(15), ":", f"{e}")
-            failed_variables.append(var_name)
-            print("*" * 80)
-            continue
-        finally:
-            print()
+        print()
+    if start_tracemalloc:
+        tracemalloc.stop()
+
     if failed_variables:
         print("Failed Variables".ljust(15), ":", ", ".join(failed_variables))
+    if trace_file:
+        try:
+            with open(trace_file, "w", encoding="utf-8") as f:
+                for var_name, trace in traces:
+                    trace.write_json_lines(f, variable=var_name)
+        except Exception as e:
+            _error(f"Error writing trace file: {e}")
+            print("Error:".ljust(15), ":", f"Failed to write trace file: {e}")
+        else:
+            print("Trace File".ljust(15), ":", Path(trace_file).as_posix())
+    memo_info = executor.memo_info()
+    lookups = memo_info.hits + memo_info.misses
+    if lookups:
+        print(
+            "Memo Hits".ljust(15),
+            ":",
+            f"{memo_info.hits}/{lookups} ({memo_info.hits / lookups:.1%}),",
+            f"{memo_info.currsize} cached results",
+        )
+    if profile:
+        print("=" * 80)
+        for line in trace_profile.format_summary_lines():
+            print(line)
     print("=" * 80)
     return 0
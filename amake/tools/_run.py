@@ -0,0 +1,150 @@
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from .common import get_schema_file, _debug, get_config_file, curdir, _error
+
+
+def run_make(
+    schema_file: Optional[str] = None,
+    config_file: Optional[str] = None,
+    current_dir: Union[str, Path, None] = None,
+    target: Optional[str] = None,
+    kill_grace_period: Optional[float] = None,
+    no_log: bool = False,
+    refresh_probes: bool = False,
+) -> int:
+    schema_file = get_schema_file(current_dir, schema_file)
+    if not schema_file:
+        print("Schema file not found.")
+        return -1
+    _debug(f"Found schema file '{schema_file}'")
+
+    config_file = get_config_file(current_dir, config_file)
+    if not config_file:
+        print("Config file not found.")
+        return -1
+    _debug(f"Found config file '{config_file}'")
+
+    current_dir = curdir(current_dir)
+
+    # 不创建任何窗口，但schema等模块依赖pyguiadapterlite，仍会导入tkinter（无需显示器）
+    from .. import buildlog
+    from ..core import AmakeCommand
+    from ..core.outputsink import make_log_file_path
+    from ..core.runner import DEFAULT_KILL_GRACE_PERIOD, ProcessRunner
+    from ..processors import create_processor_executor
+    from ..schema import AmakeSchema, AmakeConfigurations
+
+    if refresh_probes:
+        from ..probes import refresh_probes as _refresh_probes
+
+        _refresh_probes()
+
+    try:
+        schema = AmakeSchema.load(schema_file)
+    except Exception as e:
+        _error(f"Failed to load schema file: {e}")
+        print(f"Failed to load schema file: {e}")
+        return -1
+    try:
+        config = AmakeConfigurations.load(config_file)
+    except Exception as e:
+        _error(f"Failed to load config file: {e}")
+        print(f"Failed to load config file: {e}")
+        return -1
+    if target:
+        config.target = target
+    try:
+        executor = create_processor_executor()
+        schema.check_processors(executor)
+        command = AmakeCommand(
+            configurations=config, schema=schema, processor_executor=executor
+        )
+        command_list = command.to_command_list()
+    except Exception as e:
+        _error(f"Failed to generate make command: {e}")
+        print(f"Failed to generate make command: {e}")
+        return -1
+
+    log = None
+    rotation = None
+    if not no_log:
+        log_dir = buildlog.project_log_dir(current_dir.as_posix())
+        rotation = buildlog.rotate_logs_in_background(log_dir)
+        log = buildlog.BuildLog(make_log_file_path(log_dir))
+        try:
+            log.open()
+        except OSError as e:
+            _error(f"Failed to create build log: {e}")
+            log = None
+
+    print(f"Running command: {command.to_command_string()}", flush=True)
+    if log is not None:
+        print(f"Full output: {log.log_file}", flush=True)
+
+    def _on_output(text: str):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        if log is not None:
+            log.write(text)
+
+    # make在独立的进程组中运行，收不到终端的Ctrl+C，由此处结束整个进程组
+    cancelled = threading.Event()
+    restore_sigint = _install_sigint_handler(lambda *_: cancelled.set())
+
+    runner = ProcessRunner(
+        command_list,
+        shell=False,
+        cwd=current_dir.as_posix(),
+        kill_grace_period=(
+            kill_grace_period
+            if kill_grace_period is not None
+            else DEFAULT_KILL_GRACE_PERIOD
+        ),
+    )
+    start_time = time.monotonic()
+    try:
+        returncode = runner.run(
+            on_output=_on_output,
+            is_cancelled=cancelled.is_set,
+            on_cancel=lambda: print("\nInterrupted, terminating make...", flush=True),
+        )
+    except OSError as e:
+        _error(f"Failed to run make: {e}")
+        print(f"Failed to run make: {e}")
+        return -1
+    finally:
+        restore_sigint()
+        if log is not None:
+            log.close()
+    elapsed = time.monotonic() - start_time
+
+    print()
+    if runner.teardown_time is not None:
+        killed = " (killed after the grace period)" if runner.killed else ""
+        print(f"Processes terminated in: {runner.teardown_time:.2f}s{killed}")
+    if log is not None and log.diagnostics:
+        errors = sum(1 for d in log.diagnostics if buildlog.is_error(d))
+        print(
+            f"Errors / warnings: {errors} / {len(log.diagnostics) - errors}"
+            f" (run 'amake errors' to show them)"
+        )
+    if returncode < 0:
+        # 被信号结束时，与shell一致，以128+信号值作为退出码
+        returncode = 128 - returncode
+    print(f"Exit code: {returncode}")
+    print(f"Execution time: {elapsed:.2f}s")
+    if rotation is not None:
+        rotation.join()
+    return returncode
+
+
+def _install_sigint_handler(handler):
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    previous = signal.signal(signal.SIGINT, handler)
+    return lambda: signal.signal(signal.SIGINT, previous)
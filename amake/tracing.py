@@ -0,0 +1,299 @@
+"""
+管道执行跟踪，记录每个阶段的名称、参数、输入输出大小及耗时
+跟踪时只保存值的引用，值的文本表示在输出时才生成，且会被截断，因此跟踪超长列表的开销也很小
+"""
+
+import dataclasses
+import functools
+import json
+import reprlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TextIO
+
+DEFAULT_RENDER_LIMIT = 120
+
+
+@functools.lru_cache(maxsize=None)
+def _create_repr(limit: int) -> reprlib.Repr:
+    r = reprlib.Repr()
+    r.maxstring = limit
+    r.maxother = limit
+    r.maxlong = limit
+    r.maxlist = r.maxtuple = r.maxset = r.maxfrozenset = r.maxdeque = 16
+    r.maxdict = 16
+    r.maxlevel = 3
+    return r
+
+
+def render_value(value: Any, limit: int = DEFAULT_RENDER_LIMIT) -> str:
+    """生成值的文本表示，长度不超过limit，只访问需要显示的部分"""
+    text = _create_repr(limit).repr(value)
+    if len(text) > limit:
+        text = text[: limit - 3] + "..."
+    return text
+
+
+def size_of(value: Any) -> Optional[int]:
+    """返回值的长度，无长度的值返回None"""
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _describe(value: Any, limit: int) -> str:
+    size = size_of(value)
+    if size is None:
+        return f"{render_value(value, limit)} ({type(value).__name__})"
+    return f"{render_value(value, limit)} ({type(value).__name__}, size={size})"
+
+
+def _format_ns(elapsed_ns: int) -> str:
+    if elapsed_ns < 1_000_000:
+        return f"{elapsed_ns / 1000:.1f}us"
+    return f"{elapsed_ns / 1_000_000:.2f}ms"
+
+
+def _format_bytes(size: int) -> str:
+    if size < 1024:
+        return f"{size}B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f}KiB"
+    return f"{size / 1024 / 1024:.2f}MiB"
+
+
+@dataclasses.dataclass
+class StageRecord(object):
+    """管道中单个阶段（处理器）的执行记录"""
+
+    index: int
+    name: str
+    args: Tuple[Any, ...]
+    input: Any
+    output: Any = None
+    elapsed_ns: int = 0
+    error: Optional[BaseException] = None
+    # 执行期间新分配内存的峰值（字节），只在启用tracemalloc并要求测量内存时记录
+    allocated_bytes: Optional[int] = None
+
+    @property
+    def input_size(self) -> Optional[int]:
+        return size_of(self.input)
+
+    @property
+    def output_size(self) -> Optional[int]:
+        return size_of(self.output)
+
+    def to_dict(self, limit: int = DEFAULT_RENDER_LIMIT) -> Dict[str, Any]:
+        data = {
+            "stage": self.index,
+            "name": self.name,
+            "args": [render_value(arg, limit) for arg in self.args],
+            "input_type": type(self.input).__name__,
+            "input_size": self.input_size,
+            "input": render_value(self.input, limit),
+            "elapsed_us": self.elapsed_ns / 1000,
+        }
+        if self.allocated_bytes is not None:
+            data["allocated_bytes"] = self.allocated_bytes
+        if self.error is not None:
+            data["error"] = f"{type(self.error).__name__}: {self.error}"
+        else:
+            data["output_type"] = type(self.output).__name__
+            data["output_size"] = self.output_size
+            data["output"] = render_value(self.output, limit)
+        return data
+
+    def format(self, limit: int = DEFAULT_RENDER_LIMIT) -> str:
+        if self.args:
+            args = (
+                "args = (" + ", ".join(render_value(a, limit) for a in self.args) + ")"
+            )
+        else:
+            args = "args = <NoArgs>"
+        if self.error is not None:
+            output = f"error = {type(self.error).__name__}: {self.error}"
+        else:
+            output = f"output = {_describe(self.output, limit)}"
+        cost = _format_ns(self.elapsed_ns)
+        if self.allocated_bytes is not None:
+            cost += f", {_format_bytes(self.allocated_bytes)}"
+        return (
+            f"({self.index}) {self.name}".ljust(15)
+            + f"  [{cost}]"
+            + f"  input = {_describe(self.input, limit)}  {args}  {output}"
+        )
+
+
+@dataclasses.dataclass
+class PipelineTrace(object):
+    """
+    一次管道执行的跟踪记录，memoized为True时表示结果来自缓存，此时stages为空
+    """
+
+    pipeline: str
+    input: Any
+    stages: List[StageRecord] = dataclasses.field(default_factory=list)
+    result: Any = None
+    error: Optional[BaseException] = None
+    memoized: bool = False
+    elapsed_ns: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self, limit: int = DEFAULT_RENDER_LIMIT) -> Dict[str, Any]:
+        """管道整体的摘要，不包含各阶段的记录"""
+        data = {
+            "pipeline": self.pipeline,
+            "input_type": type(self.input).__name__,
+            "input_size": size_of(self.input),
+            "input": render_value(self.input, limit),
+            "stages": len(self.stages),
+            "memoized": self.memoized,
+            "elapsed_us": self.elapsed_ns / 1000,
+        }
+        if self.error is not None:
+            data["error"] = f"{type(self.error).__name__}: {self.error}"
+        else:
+            data["result_type"] = type(self.result).__name__
+            data["result_size"] = size_of(self.result)
+            data["result"] = render_value(self.result, limit)
+        return data
+
+    def to_json_lines(
+        self, limit: int = DEFAULT_RENDER_LIMIT, **extra: Any
+    ) -> Iterator[str]:
+        """
+        以JSON lines格式输出跟踪记录，第一行为管道摘要，其后每行为一个阶段，extra中的字段会添加到每一行中
+        """
+        yield json.dumps(
+            {**extra, "event": "pipeline", **self.to_dict(limit)}, ensure_ascii=False
+        )
+        for stage in self.stages:
+            yield json.dumps(
+                {**extra, "event": "stage", **stage.to_dict(limit)}, ensure_ascii=False
+            )
+
+    def write_json_lines(
+        self, fp: TextIO, limit: int = DEFAULT_RENDER_LIMIT, **extra: Any
+    ):
+        for line in self.to_json_lines(limit, **extra):
+            fp.write(line)
+            fp.write("\n")
+
+    def format_lines(self, limit: int = DEFAULT_RENDER_LIMIT) -> List[str]:
+        """生成便于阅读的文本，每个阶段一行"""
+        if self.memoized:
+            return [
+                "(memoized)".ljust(15)
+                + f"  [{_format_ns(self.elapsed_ns)}]"
+                + f"  output = {_describe(self.result, limit)}"
+            ]
+        return [stage.format(limit) for stage in self.stages]
+
+
+@dataclasses.dataclass
+class StageStats(object):
+    """
+    性能分析中单个阶段的统计数据
+    self_ns为阶段本身的耗时，cumulative_ns为管道开始执行到该阶段结束的耗时（即包含此前各阶段）
+    """
+
+    variable: str
+    index: int
+    name: str
+    calls: int = 0
+    self_ns: int = 0
+    cumulative_ns: int = 0
+    allocated_bytes: int = 0
+
+
+@dataclasses.dataclass
+class ProcessorStats(object):
+    """性能分析中单个处理器在所有变量中的汇总统计数据"""
+
+    name: str
+    calls: int = 0
+    self_ns: int = 0
+    allocated_bytes: int = 0
+
+
+class TraceProfile(object):
+    """
+    汇总多次管道执行的跟踪记录，按变量及阶段统计调用次数、耗时及内存分配，并找出最慢的阶段
+    """
+
+    def __init__(self):
+        self._stages: Dict[Tuple[str, int], StageStats] = {}
+
+    def add(self, variable: str, trace: PipelineTrace):
+        cumulative = 0
+        for stage in trace.stages:
+            cumulative += stage.elapsed_ns
+            key = (variable, stage.index)
+            stats = self._stages.get(key)
+            if stats is None:
+                stats = self._stages[key] = StageStats(
+                    variable, stage.index, stage.name
+                )
+            stats.calls += 1
+            stats.self_ns += stage.elapsed_ns
+            stats.cumulative_ns += cumulative
+            stats.allocated_bytes += stage.allocated_bytes or 0
+
+    def stage_stats(self, variable: Optional[str] = None) -> List[StageStats]:
+        return [
+            stats
+            for stats in self._stages.values()
+            if variable is None or stats.variable == variable
+        ]
+
+    def slowest_stages(self, count: int = 10) -> List[StageStats]:
+        return sorted(self._stages.values(), key=lambda s: s.self_ns, reverse=True)[
+            :count
+        ]
+
+    def processor_stats(self) -> List[ProcessorStats]:
+        """按处理器名称汇总，按总耗时从高到低排序"""
+        processors: Dict[str, ProcessorStats] = {}
+        for stats in self._stages.values():
+            total = processors.get(stats.name)
+            if total is None:
+                total = processors[stats.name] = ProcessorStats(stats.name)
+            total.calls += stats.calls
+            total.self_ns += stats.self_ns
+            total.allocated_bytes += stats.allocated_bytes
+        return sorted(processors.values(), key=lambda s: s.self_ns, reverse=True)
+
+    def format_stage_lines(self, variable: str) -> List[str]:
+        lines = [
+            f"{'stage':<20}{'calls':>7}{'self':>12}{'cumulative':>12}{'allocated':>12}"
+        ]
+        for stats in self.stage_stats(variable):
+            lines.append(
+                f"{f'({stats.index}) {stats.name}':<20}{stats.calls:>7}"
+                f"{_format_ns(stats.self_ns):>12}{_format_ns(stats.cumulative_ns):>12}"
+                f"{_format_bytes(stats.allocated_bytes):>12}"
+            )
+        return lines
+
+    def format_summary_lines(self, count: int = 10) -> List[str]:
+        lines = [
+            "Slowest Stages:",
+            f"  {'variable':<20}{'stage':<20}{'calls':>7}{'self':>12}{'allocated':>12}",
+        ]
+        for stats in self.slowest_stages(count):
+            lines.append(
+                f"  {stats.variable:<20}{f'({stats.index}) {stats.name}':<20}"
+                f"{stats.calls:>7}{_format_ns(stats.self_ns):>12}"
+                f"{_format_bytes(stats.allocated_bytes):>12}"
+            )
+        lines.append("Processors:")
+        lines.append(f"  {'processor':<20}{'calls':>7}{'self':>12}{'allocated':>12}")
+        for stats in self.processor_stats():
+            lines.append(
+                f"  {stats.name:<20}{stats.calls:>7}{_format_ns(stats.self_ns):>12}"
+                f"{_format_bytes(stats.allocated_bytes):>12}"
+            )
+        return lines
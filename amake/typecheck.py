@@ -0,0 +1,98 @@
+"""
+处理器管道的静态类型推断
+根据处理器函数第一个参数及返回值的注解，推断管道中每个阶段的输入、输出类型。
+类型以Python类型的元组表示，None表示类型未知（或为Any），未知类型与任何类型兼容
+"""
+
+import inspect
+import types
+import typing
+from typing import Any, Callable, Optional, Tuple
+
+Types = Optional[Tuple[type, ...]]
+
+# 按照PEP 484的约定，接收float的参数同样接收int
+_IMPLICIT_PROMOTIONS = {float: (int,), complex: (int, float)}
+
+# PEP 604的联合类型（如str | list）的原始类型，Python 3.10之前不存在
+_UNION_ORIGINS = tuple(
+    origin
+    for origin in (typing.Union, getattr(types, "UnionType", None))
+    if origin is not None
+)
+
+
+def resolve_annotation(annotation: Any) -> Types:
+    """将注解转换为类型元组，Any、缺失的注解及无法识别的注解返回None"""
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return None
+    if annotation is None or annotation is type(None):
+        return (type(None),)
+    origin = typing.get_origin(annotation)
+    if origin in _UNION_ORIGINS:
+        resolved_types = []
+        for arg in typing.get_args(annotation):
+            resolved = resolve_annotation(arg)
+            if resolved is None:
+                return None
+            resolved_types.extend(resolved)
+        return tuple(resolved_types)
+    if origin is not None:
+        # List[str]等泛型只检查其原始类型，Literal、Annotated等无法识别的形式视为未知
+        return (origin,) if isinstance(origin, type) else None
+    if isinstance(annotation, type):
+        return (annotation,)
+    return None
+
+
+def _type_hints(func: Callable) -> dict:
+    try:
+        return typing.get_type_hints(func)
+    except Exception:
+        # 注解无法求值时（如引用了不存在的名称），视为没有注解
+        return {}
+
+
+def signature_types(func: Callable) -> Tuple[Types, Types]:
+    """返回处理器函数的(输入类型, 输出类型)"""
+    try:
+        params = list(inspect.signature(func).parameters.values())
+    except (TypeError, ValueError):
+        return None, None
+    hints = _type_hints(func)
+    input_types = None
+    if params:
+        input_types = resolve_annotation(
+            hints.get(params[0].name, inspect.Parameter.empty)
+        )
+    output_types = resolve_annotation(hints.get("return", inspect.Parameter.empty))
+    return input_types, output_types
+
+
+def is_compatible(value_types: Types, accepted: Types) -> bool:
+    """
+    判断类型为value_types的值能否传递给接收accepted的参数，任一方未知时视为兼容；
+    value_types包含多个类型时，只要其中一个可以被接收即视为兼容，即只拒绝一定会出错的情况
+    """
+    if value_types is None or accepted is None:
+        return True
+    for value_type in value_types:
+        for accepted_type in accepted:
+            if issubclass(value_type, accepted_type):
+                return True
+            if value_type in _IMPLICIT_PROMOTIONS.get(accepted_type, ()):
+                return True
+    return False
+
+
+def describe(types: Types) -> str:
+    if types is None:
+        return "Any"
+    return " | ".join(t.__name__ for t in types)
+
+
+def exact_type(types: Types) -> Optional[type]:
+    """类型确定为唯一的类型时返回该类型，否则返回None"""
+    if types is not None and len(types) == 1:
+        return types[0]
+    return None
@@ -1,5 +1,6 @@
 import dataclasses
-from typing import Dict, Union, Any
+import functools
+from typing import Dict, Union, Any, Optional
 
 from pyguiadapterlite import ParameterWidgetFactory, BaseParameterWidgetConfig
 
@@ -18,6 +19,10 @@ class UnknownDefaultValueType(Exception):
     pass
 
 
+class CircularVariableReference(Exception):
+    pass
+
+
 @dataclasses.dataclass(frozen=True)
 class Variable(object):
     parameter_config: BaseParameterWidgetConfig
@@ -77,3 +82,20 @@ def analyze_variable(
         param_config = dataclasses.replace(param_config, **replacements)
 
     return Variable(param_config, processor, var_type)
+
+
+@functools.lru_cache(maxsize=None)
+def variable_value_type(typename: str) -> Optional[type]:
+    """
+    返回变量类型对应的值的Python类型，即该类型的控件所产生的值的类型，无法确定时返回None
+    """
+    widget = ParameterWidgetFactory.find_by_typename(typename)
+    if not widget or not widget.ConfigClass:
+        return None
+    try:
+        default_value = widget.ConfigClass.new().default_value
+    except Exception:
+        return None
+    if default_value is None:
+        return None
+    return type(default_value)
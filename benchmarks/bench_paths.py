@@ -0,0 +1,68 @@
+"""
+Benchmarks for the batched path processors.
+
+Compares posixpath_each/abspath_each against the per-item implementations
+they replaced (a pathlib.Path per element, os.path.abspath() per element).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_paths
+"""
+
+import os
+import timeit
+from pathlib import Path
+from typing import Any, Callable, List
+
+from amake import processors
+
+REPEAT = 5
+SIZES = (10_000, 100_000)
+
+
+def _posixpath_each_before(input_data: list) -> list:
+    return [Path(x).as_posix() for x in input_data]
+
+
+def _abspath_each_before(input_data: list) -> list:
+    return [os.path.abspath(x) for x in input_data]
+
+
+def _make_paths(count: int) -> List[str]:
+    # a mix of clean paths and paths that need normalization
+    paths = []
+    for i in range(count):
+        if i % 4 == 0:
+            paths.append(f"./third_party/lib{i}//include/")
+        else:
+            paths.append(f"src/module{i % 100}/file{i}.c")
+    return paths
+
+
+def _best(func: Callable[[Any], Any], value: Any, number: int) -> float:
+    return (
+        min(timeit.repeat(lambda: func(value), number=number, repeat=REPEAT)) / number
+    )
+
+
+def _compare(name: str, before: Callable, after: Callable):
+    for size in SIZES:
+        value = _make_paths(size)
+        assert before(value) == after(value)
+        number = max(1, 200_000 // size)
+        t_before = _best(before, value, number)
+        t_after = _best(after, value, number)
+        print(
+            f"  {name:<16} {size:>7} items  before: {t_before * 1e3:8.2f} ms"
+            f"  after: {t_after * 1e3:8.2f} ms  ({t_before / t_after:.1f}x)"
+        )
+
+
+def main():
+    print("batched path processors")
+    _compare("posixpath_each", _posixpath_each_before, processors.posixpath_each)
+    _compare("abspath_each", _abspath_each_before, processors.abspath_each)
+
+
+if __name__ == "__main__":
+    main()
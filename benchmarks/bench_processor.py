@@ -0,0 +1,217 @@
+"""
+Micro-benchmarks for the processor executor.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_processor
+
+Results (CPython 3.11, Linux x86_64, default ProcessorExecutor, i.e. no memo):
+
+    per-step dispatch overhead
+      strip                before:  12728.9 ns  after:    435.9 ns  (29.2x)
+      prefix_each '-I'     before:  13992.0 ns  after:   1016.5 ns  (13.8x)
+    whole pipeline
+      command dispatch:   4294.3 ns  compiled:    711.9 ns  (6.0x)
+    element-wise fusion (10000 items)
+      stage by stage:     1.73 ms  fused:     1.02 ms  (1.7x)
+    streaming execution (100000 items)
+      peak memory eager:   8133.9 KiB  streaming:    107.4 KiB  (75.8x)
+    memoization (every call a memo hit)
+          4 items  recompute:     0.64 us  memo hit:     1.93 us  (0.3x)
+       4000 items  recompute:   429.87 us  memo hit:   658.06 us  (0.7x)
+    argument parsing
+      literal_eval:   6364.7 ns  cached:    825.1 ns  (7.7x)
+"""
+
+import inspect
+import timeit
+import tracemalloc
+from typing import Any, Callable, List
+
+from amake import processors
+from amake.processor import CommandTokenizer, ProcessorExecutor
+
+NUMBER = 100_000
+REPEAT = 5
+
+
+def _create_executor() -> ProcessorExecutor:
+    executor = ProcessorExecutor()
+    for name, func in processors.get_builtins().items():
+        executor.register(func=func, name=name)
+    return executor
+
+
+def _exec_func_by_signature(func: Callable, input_data: Any, args: List[Any]) -> Any:
+    # the dispatch used before calling conventions were resolved at register time
+    sig = inspect.signature(func)
+    params = list(sig.parameters.values())
+    if len(params) == 1:
+        return func(input_data)
+    return func(input_data, *args)
+
+
+def _best(stmt: Callable[[], Any]) -> float:
+    return min(timeit.repeat(stmt, number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def bench_step_dispatch():
+    executor = _create_executor()
+    cases = [
+        ("strip", "  value  "),
+        ("prefix_each '-I'", ["include", "src"]),
+    ]
+    print("per-step dispatch overhead")
+    for pipeline, value in cases:
+        command = executor.parse_processor(pipeline)[0]
+
+        def _before():
+            _exec_func_by_signature(command.func, value, command.args)
+
+        def _after():
+            executor._exec_command(command, value)
+
+        before = _best(_before)
+        after = _best(_after)
+        print(
+            f"  {pipeline:<20} before: {before * 1e9:8.1f} ns  after: {after * 1e9:8.1f} ns"
+            f"  ({before / after:.1f}x)"
+        )
+
+
+def bench_compiled_pipeline():
+    executor = _create_executor()
+    pipeline = "strip_each | no_empty | prefix_each '-I' | join ' ' | strip"
+    value = [" include ", "", "src", "third_party/include"]
+    commands = executor.parse_processor(pipeline)
+    compiled = executor.compile(pipeline)
+
+    def _dispatch():
+        data = value
+        for command in commands:
+            data = executor._exec_command(command, data)
+        return data
+
+    def _compiled():
+        return compiled(value)
+
+    dispatch = _best(_dispatch)
+    fused = _best(_compiled)
+    print("whole pipeline")
+    print(
+        f"  command dispatch: {dispatch * 1e9:8.1f} ns  compiled: {fused * 1e9:8.1f} ns"
+        f"  ({dispatch / fused:.1f}x)"
+    )
+
+
+def bench_element_wise_fusion():
+    executor = _create_executor()
+    pipeline = "strip_each | no_empty | prefix_each '-I' | join"
+    value = [f" third_party/lib{i}/include " for i in range(10_000)]
+    commands = executor.parse_processor(pipeline)
+    compiled = executor.compile(pipeline)
+    number = 50
+
+    def _dispatch():
+        data = value
+        for command in commands:
+            data = executor._exec_command(command, data)
+        return data
+
+    def _compiled():
+        return compiled(value)
+
+    dispatch = min(timeit.repeat(_dispatch, number=number, repeat=REPEAT)) / number
+    fused = min(timeit.repeat(_compiled, number=number, repeat=REPEAT)) / number
+    print(f"element-wise fusion ({len(value)} items)")
+    print(
+        f"  stage by stage: {dispatch * 1e3:8.2f} ms  fused: {fused * 1e3:8.2f} ms"
+        f"  ({dispatch / fused:.1f}x)"
+    )
+
+
+def _peak_memory(func: Callable[[Any], Any], value: Any) -> int:
+    tracemalloc.start()
+    try:
+        func(value)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_streaming():
+    executor = _create_executor()
+    pipeline = (
+        "strip_each | no_empty | normpath_each | posixpath_each | distinct | join"
+    )
+    # source lists collected from several globs usually contain many duplicates
+    value = [f" third_party/lib{i % 1000}/include " for i in range(100_000)]
+    eager = _peak_memory(executor.compile(pipeline), value)
+    streaming = _peak_memory(executor.compile(pipeline, streaming=True), value)
+    print(f"streaming execution ({len(value)} items)")
+    print(
+        f"  peak memory eager: {eager / 1024:8.1f} KiB  streaming: {streaming / 1024:8.1f} KiB"
+        f"  ({eager / streaming:.1f}x)"
+    )
+
+
+def bench_memo():
+    # memoization is opt-in: for the builtin processors freezing the input and
+    # copying the result costs more than running the pipeline again
+    pipeline = "strip_each | no_empty | prefix_each '-I' | join ' ' | strip"
+    cases = [
+        ([" include ", "", "src", "third_party/include"], NUMBER),
+        ([f" third_party/lib{i}/include " for i in range(4000)], 200),
+    ]
+    plain = _create_executor().compile(pipeline)
+    memo_executor = ProcessorExecutor(memo_size=1024)
+    for name, func in processors.get_builtins().items():
+        memo_executor.register(func=func, name=name)
+    memoized = memo_executor.compile(pipeline)
+    print("memoization (every call a memo hit)")
+    for value, number in cases:
+        memoized(value)
+        before = min(timeit.repeat(lambda: plain(value), number=number, repeat=REPEAT))
+        after = min(
+            timeit.repeat(lambda: memoized(value), number=number, repeat=REPEAT)
+        )
+        before, after = before / number, after / number
+        print(
+            f"  {len(value):>5} items  recompute: {before * 1e6:8.2f} us"
+            f"  memo hit: {after * 1e6:8.2f} us  ({before / after:.1f}x)"
+        )
+
+
+def bench_parse_value():
+    tokens = ["'-I'", "' '", "''", "None", "[1, 2]"]
+    uncached = CommandTokenizer(cache_size=0)
+    cached = CommandTokenizer()
+
+    def _uncached():
+        for token in tokens:
+            uncached.parse_value(token)
+
+    def _cached():
+        for token in tokens:
+            cached.parse_value(token)
+
+    before = _best(_uncached) / len(tokens)
+    after = _best(_cached) / len(tokens)
+    print("argument parsing")
+    print(
+        f"  literal_eval: {before * 1e9:8.1f} ns  cached: {after * 1e9:8.1f} ns"
+        f"  ({before / after:.1f}x)"
+    )
+
+
+def main():
+    bench_step_dispatch()
+    bench_compiled_pipeline()
+    bench_element_wise_fusion()
+    bench_streaming()
+    bench_memo()
+    bench_parse_value()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,10 @@ Usage:
     amake init [-C <dir> | --current-dir=<dir>] [-t <template> | --template=<template>] [--no-edit] [<schemafile>]
     amake init-config [-C <dir> | --current-dir=<dir>] [<schemafile>] [<configfile>]
     amake edit [-C <dir> | --current-dir=<dir>] [-T | --text-editor] [<schemafile>]
-    amake process [-C <dir> | --current-dir=<dir>] [--vars=<vars,...>] [<schemafile>] [<configfile>]
-    amake generate [-C <dir> | --current-dir=<dir>] [-o <outputfile> | --output=<outputfile>] [-Y | --yes] [<schemafile>] [<configfile>]
+    amake process [-C <dir> | --current-dir=<dir>] [--vars=<vars,...>] [--trace=<tracefile>] [--profile] [--memo=<size>] [--refresh-probes] [<schemafile>] [<configfile>]
+    amake generate [-C <dir> | --current-dir=<dir>] [-o <outputfile> | --output=<outputfile>] [-Y | --yes] [--refresh-probes] [<schemafile>] [<configfile>]
+    amake run [-C <dir> | --current-dir=<dir>] [--target=<target>] [--kill-grace=<seconds>] [--no-log] [--refresh-probes] [<schemafile>] [<configfile>]
+    amake errors [-C <dir> | --current-dir=<dir>] [--log=<logfile>] [--warnings] [--context=<lines>] [<n>]
 
 Commands:
     init        Initialize a new amake project in the current directory. An amake project means a directory
@@ -55,9 +57,24 @@ Commands:
                 previous "join" processor as its input, and removes the leading and trailing spaces(if any). Since the
                 "strip" processor is the last processor in the chain, its output will be the final value of the "INCLUDES"
                 variable and be passed to the makefile.
+                The arguments of a processor can reference the processed value of another variable with "${NAME}",
+                e.g. "prefix '${BUILDDIR}/'" on the "OBJDIR" variable. Variables are processed after the variables they
+                reference, and circular references are reported when the schema is loaded.
 
     generate    Generate a build script based on the amake schema and the variable values in the config file.
 
+    run         Run make with the variable values in the config file, without the GUI. The make command is built
+                the same way as in the GUI, make runs in the current directory and its output is streamed to stdout
+                and saved to ".amake/logs", and the exit code of make becomes the exit code of amake (128+N if make
+                is killed by signal N). Ctrl+C terminates make and all the processes it started. This command is
+                intended for CI and other headless environments, no window is created.
+
+    errors      List the compiler errors (GCC/Clang style "file:line:col: error: message") of the last build, or show
+                the <n>th error with the lines following it. Every build started from the GUI or with "amake run" writes
+                its full output to ".amake/logs" in the project directory, together with an index of the errors and
+                warnings found in the output, so this command reads only the index and the lines it shows, no matter
+                how large the log is. Older logs are compressed and only the last 20 are kept.
+
     appconfig   A command to manage the amake app configuration.
 
 
@@ -86,11 +103,43 @@ Options:
     --vars=<vars,...>                        Specify the variables to run processors on. If not specified, all variables
                                              will be processed.
 
+    --trace=<tracefile>                      Write the execution trace of the processors to the specified file in JSON
+                                             lines format. Each variable produces a "pipeline" line followed by one
+                                             "stage" line per processor, with its arguments, input/output sizes and time.
+
+    --profile                                Profile the processors: report call count, self and cumulative time and
+                                             allocated bytes (measured with tracemalloc) of each stage of each variable,
+                                             followed by a summary of the slowest stages and processors.
+
+    --memo=<size>                            Remember the results of up to <size> pipelines made only of pure processors,
+                                             so the same pipeline on the same value runs once, and report the memo hit
+                                             rate. Off by default: for the builtin processors remembering a result costs
+                                             more than recomputing it. Ignored with --profile.
+
+    --refresh-probes                         Ignore the cached results of toolchain probe processors (pkg_config_cflags,
+                                             find_program, compiler_supports_flag .etc) and probe again. Probe results
+                                             are cached in the app data directory and expire after 7 days, or as soon as
+                                             the probed tool is replaced.
+
     -o <outputfile> | --output=<outputfile>  Specify the output file for the generated build script. If not specified,
                                              use "build.sh" in the current directory.
 
     -Y, --yes                                When specified, it will not ask for confirmation before some important
                                              operations, such as generating the build script or resetting the app config .etc.
+
+    --target=<target>                        Specify the make target to build instead of the target in the config file.
+
+    --kill-grace=<seconds>                   The seconds to wait for make and the processes it started to exit after
+                                             Ctrl+C before they are killed, 5 by default.
+
+    --no-log                                 Do not save the output of make to ".amake/logs".
+
+    --log=<logfile>                          Specify the build log to read. If not specified, use the latest log in
+                                             ".amake/logs" in the current directory.
+
+    --warnings                               Include warnings and notes, not only errors.
+
+    --context=<lines>                        The number of lines to show starting from the error, 8 by default.
 """
 
 import builtins
@@ -114,7 +163,7 @@ from amake.consts import (
 
 _DEBUG_MODE = True
 
-ALL_COMMANDS = ("edit", "init", "init-config", "process", "generate")
+ALL_COMMANDS = ("edit", "init", "init-config", "process", "generate", "run", "errors")
 
 
 def _debug(msg):
@@ -327,10 +376,28 @@ def _run_command_process(args) -> int:
         variables = [v.strip() for v in variables.split(",") if v.strip()]
     else:
         variables = None
+    trace_file = get_one_of(args, "--trace", "<tracefile>", default=None)
+    profile = any_true(args, "--profile")
+    refresh_probes = any_true(args, "--refresh-probes")
+    memo_size = get_one_of(args, "--memo", "<size>", default=None)
+    try:
+        memo_size = int(memo_size) if memo_size is not None else 0
+    except ValueError as e:
+        print(f"Invalid number: {e}")
+        return -1
 
     from amake.tools import run_processors
 
-    return run_processors(schema_file, config_file, current_dir, variables)
+    return run_processors(
+        schema_file,
+        config_file,
+        current_dir,
+        variables,
+        trace_file,
+        profile,
+        refresh_probes,
+        memo_size,
+    )
 
 
 def _run_command_generate(args) -> int:
@@ -339,11 +406,59 @@ def _run_command_generate(args) -> int:
     current_dir = get_one_of(args, "--current-dir", "<dir>", default=None)
     output_file = get_one_of(args, "--output", "<outputfile>", default=None)
     no_confirm = any_true(args, "--yes", "-Y")
+    refresh_probes = any_true(args, "--refresh-probes")
 
     from amake.tools import generate_build_script
 
     return generate_build_script(
-        schema_file, config_file, current_dir, output_file, no_confirm
+        schema_file, config_file, current_dir, output_file, no_confirm, refresh_probes
+    )
+
+
+def _run_command_run(args) -> int:
+    schema_file = get_one_of(args, "--schema", "<schemafile>", default=None)
+    config_file = get_one_of(args, "--config", "<configfile>", default=None)
+    current_dir = get_one_of(args, "--current-dir", "<dir>", default=None)
+    target = get_one_of(args, "--target", "<target>", default=None)
+    no_log = any_true(args, "--no-log")
+    refresh_probes = any_true(args, "--refresh-probes")
+    kill_grace_period = get_one_of(args, "--kill-grace", "<seconds>", default=None)
+    try:
+        if kill_grace_period is not None:
+            kill_grace_period = float(kill_grace_period)
+    except ValueError as e:
+        print(f"Invalid number: {e}")
+        return -1
+
+    from amake.tools import run_make
+
+    return run_make(
+        schema_file,
+        config_file,
+        current_dir,
+        target,
+        kill_grace_period,
+        no_log,
+        refresh_probes,
+    )
+
+
+def _run_command_errors(args) -> int:
+    current_dir = get_one_of(args, "--current-dir", "<dir>", default=None)
+    log_file = get_one_of(args, "--log", "<logfile>", default=None)
+    include_warnings = any_true(args, "--warnings")
+    try:
+        nth = args.get("<n>")
+        nth = int(nth) if nth is not None else None
+        context_lines = int(get_one_of(args, "--context", "<lines>", default="8"))
+    except ValueError as e:
+        print(f"Invalid number: {e}")
+        return -1
+
+    from amake.tools import show_build_errors
+
+    return show_build_errors(
+        current_dir, log_file, nth, include_warnings, context_lines
     )
 
 
@@ -373,6 +488,12 @@ def main():
     if args.get("generate", True):
         return _run_command_generate(args)
 
+    if args.get("run", True):
+        return _run_command_run(args)
+
+    if args.get("errors", True):
+        return _run_command_errors(args)
+
     return -1
 
 
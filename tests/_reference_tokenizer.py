@@ -0,0 +1,167 @@
+"""
+单次扫描的分词器（processor._scan）引入之前的逐字符实现，原样保留，作为等价性测试的参照
+修改分词器时，tests/test_tokenizer_equivalence.py会比较两者在随机管道字符串上的结果
+"""
+
+import ast
+from typing import Any, Callable, List
+
+from amake.processor import InvalidArgument
+
+
+def tokenize(command_str: str) -> List[str]:
+    tokens = []
+    current_token = ""
+    in_quotes = None  # 当前是否在引号内，None表示不在，'或"表示在哪种引号内
+    in_brackets = 0  # 括号嵌套深度
+    in_parens = 0  # 圆括号嵌套深度
+    escape_next = False  # 是否转义下一个字符
+
+    i = 0
+    while i < len(command_str):
+        char = command_str[i]
+
+        # 处理转义字符
+        if escape_next:
+            current_token += char
+            escape_next = False
+            i += 1
+            continue
+
+        if char == "\\":
+            escape_next = True
+            current_token += char
+            i += 1
+            continue
+
+        # 处理引号
+        if char in ('"', "'") and in_brackets == 0 and in_parens == 0:
+            if in_quotes is None:
+                in_quotes = char
+            elif in_quotes == char:
+                in_quotes = None
+            current_token += char
+            i += 1
+            continue
+
+        # 处理方括号（列表）
+        if char == "[" and in_quotes is None:
+            in_brackets += 1
+            current_token += char
+            i += 1
+            continue
+
+        if char == "]" and in_quotes is None and in_brackets > 0:
+            in_brackets -= 1
+            current_token += char
+            i += 1
+            continue
+
+        # 处理圆括号（元组）
+        if char == "(" and in_quotes is None:
+            in_parens += 1
+            current_token += char
+            i += 1
+            continue
+
+        if char == ")" and in_quotes is None and in_parens > 0:
+            in_parens -= 1
+            current_token += char
+            i += 1
+            continue
+
+        # 处理空格分隔（仅在不在引号或括号内时）
+        if char == " " and in_quotes is None and in_brackets == 0 and in_parens == 0:
+            if current_token:
+                tokens.append(current_token)
+                current_token = ""
+            i += 1
+            continue
+
+        current_token += char
+        i += 1
+
+    # 添加最后一个token
+    if current_token:
+        tokens.append(current_token)
+    return tokens
+
+
+def parse_value(token: str, invalid_arg_handler: Callable[[str], Any]) -> Any:
+    if not token:
+        return ""
+
+    if token.lower() in ("none", "null"):
+        return None
+
+    if token.lower() == "true":
+        return True
+
+    if token.lower() == "false":
+        return False
+
+    try:
+        return ast.literal_eval(token)
+    except BaseException as e:
+        if not invalid_arg_handler:
+            raise InvalidArgument(f"invalid argument: {token}") from e
+        return invalid_arg_handler(token)
+
+
+def split_processor_str(pipeline_str: str) -> List[str]:
+    parts = []
+    current_part = ""
+    in_quotes = None
+    escape_next = False
+
+    i = 0
+    while i < len(pipeline_str):
+        char = pipeline_str[i]
+
+        # 处理转义字符
+        if escape_next:
+            current_part += char
+            escape_next = False
+            i += 1
+            continue
+
+        if char == "\\":
+            escape_next = True
+            current_part += char
+            i += 1
+            continue
+
+        # 处理引号
+        if char in ('"', "'"):
+            if in_quotes is None:
+                in_quotes = char
+            elif in_quotes == char:
+                in_quotes = None
+            current_part += char
+            i += 1
+            continue
+
+        # 处理管道符号（仅在不在引号内时分割）
+        if char == "|" and in_quotes is None:
+            parts.append(current_part.strip())
+            current_part = ""
+            i += 1
+            continue
+
+        current_part += char
+        i += 1
+
+    # 添加最后一部分
+    if current_part:
+        parts.append(current_part.strip())
+
+    return parts
+
+
+def lex(pipeline_str: str) -> List[List[str]]:
+    """旧的_parse_processor()的分词方式：先分割管道，再对每个非空部分分词"""
+    return [
+        tokenize(part.strip())
+        for part in split_processor_str(pipeline_str)
+        if part.strip()
+    ]
@@ -0,0 +1,32 @@
+import threading
+
+from amake.processors import create_processor_executor
+
+
+def current_thread_name(input_data):
+    return threading.current_thread().name
+
+
+def test_pool_is_reused_across_batches():
+    with create_processor_executor(max_workers=2) as executor:
+        executor.register(current_thread_name)
+        jobs = [(i, "current_thread_name", None) for i in range(4)]
+        executor.execute_all(jobs)
+        pool = executor._pool
+        assert pool is not None
+        executor.execute_all(jobs)
+        assert executor._pool is pool
+    assert executor._pool is None
+
+
+def test_pool_is_rebuilt_after_registry_changes():
+    with create_processor_executor(max_workers=2) as executor:
+        executor.execute_all([(i, "strip", " a ") for i in range(2)])
+        pool = executor._pool
+        executor.register(current_thread_name)
+        assert executor._pool is None
+        results = executor.execute_all(
+            [(i, "current_thread_name", None) for i in range(2)]
+        )
+        assert executor._pool is not None and executor._pool is not pool
+        assert len(results) == 2
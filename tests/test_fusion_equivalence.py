@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from amake.processor import ProcessorExecutor
+from amake.processors import create_processor_executor
+
+ITERATIONS = 1000
+SEEDS = range(4)
+
+# 可以合并的逐元素处理器，及会打断合并的其他处理器
+ELEMENT_WISE_STAGES = [
+    "strip_each",
+    "strip_each ' x'",
+    "no_empty",
+    "prefix_each '-I'",
+    "suffix_each '.o'",
+    "replace_each 'a' 'b'",
+    "normpath_each",
+    "posixpath_each",
+]
+OTHER_STAGES = ["distinct", "dedupe_keep_last"]
+ITEMS = ["", " ", "a", " a ", "x a x", "b/../a", "./c", "a\\b", "-Ia"]
+
+
+def _random_pipeline(rng: random.Random) -> str:
+    stages = []
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.8:
+            stages.append(rng.choice(ELEMENT_WISE_STAGES))
+        else:
+            stages.append(rng.choice(OTHER_STAGES))
+    return " | ".join(stages)
+
+
+def _random_input(rng: random.Random):
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    if roll < 0.1:
+        # 非字符串元素，各阶段应抛出相同类型的异常
+        return ["a", 1]
+    return [rng.choice(ITEMS) for _ in range(rng.randint(0, 6))]
+
+
+def _run_unfused(executor: ProcessorExecutor, pipeline_str: str, data):
+    for command in executor.parse_processor(pipeline_str):
+        data = ProcessorExecutor._exec_command(command, data)
+    return data
+
+
+def _outcome(func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        return type(e)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("streaming", [False, True])
+def test_fused_pipeline_matches_stage_by_stage(seed, streaming):
+    rng = random.Random(seed)
+    executor = create_processor_executor()
+    for _ in range(ITERATIONS):
+        pipeline_str = _random_pipeline(rng)
+        data = _random_input(rng)
+        expected = _outcome(_run_unfused, executor, pipeline_str, data)
+        actual = _outcome(
+            lambda: executor.execute(pipeline_str, data, streaming=streaming)
+        )
+        assert actual == expected, (pipeline_str, data)
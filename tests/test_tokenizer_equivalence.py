@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import _reference_tokenizer as reference
+from amake.processor import CommandTokenizer, ProcessorError, ProcessorExecutor
+from amake.processors import create_processor_executor
+
+ITERATIONS = 5000
+SEEDS = range(4)
+
+# 随机生成的参数中常有无效的转义序列，literal_eval()会因此发出警告
+pytestmark = pytest.mark.filterwarnings(
+    "ignore::DeprecationWarning", "ignore::SyntaxWarning"
+)
+
+# 随机管道字符串的组成部分，包括单个的特殊字符及常见的参数形式
+FRAGMENTS = [
+    "'",
+    '"',
+    "[",
+    "]",
+    "(",
+    ")",
+    "\\",
+    "|",
+    " ",
+    "  ",
+    "\t",
+    ",",
+    "a",
+    "b1",
+    "-I",
+    "1",
+    "-2.5",
+    "None",
+    "null",
+    "True",
+    "false",
+    "'x y'",
+    '"a|b"',
+    "'it\\'s'",
+    "[1, 'a b']",
+    "('a', 3)",
+    "{'k': [1]}",
+    "${NAME}",
+]
+
+
+def _random_text(rng: random.Random, max_fragments: int = 12) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, max_fragments)))
+
+
+def _random_pipeline(rng: random.Random, names) -> str:
+    stages = []
+    for _ in range(rng.randint(1, 4)):
+        # 多数阶段以已注册的处理器开头，使parse_processor()能够解析到参数
+        head = rng.choice(names) if rng.random() < 0.8 else _random_text(rng, 2)
+        stages.append(head + rng.choice(["", " ", "  "]) + _random_text(rng))
+    return rng.choice(["|", " | ", "|  "]).join(stages) + rng.choice(["", " ", "|"])
+
+
+def _parse_reference(executor: ProcessorExecutor, pipeline_str: str):
+    parsed = []
+    for tokens in reference.lex(pipeline_str):
+        executor.get_processor_function(tokens[0])
+        args = [reference.parse_value(t, lambda x: x) for t in tokens[1:]]
+        parsed.append((tokens[0], repr(args)))
+    return parsed
+
+
+def _outcome(func, *args):
+    try:
+        return func(*args)
+    except ProcessorError as e:
+        return type(e)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_tokenize_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(ITERATIONS):
+        text = _random_text(rng, 20)
+        assert CommandTokenizer.tokenize(text) == reference.tokenize(text), text
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_split_and_lex_match_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(ITERATIONS):
+        text = _random_text(rng, 20)
+        assert ProcessorExecutor.split_processor_str(
+            text
+        ) == reference.split_processor_str(text), text
+        assert CommandTokenizer.lex(text) == reference.lex(text), text
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_processor_matches_reference(seed):
+    rng = random.Random(seed)
+    executor = create_processor_executor()
+    names = executor.processor_functions
+    for _ in range(ITERATIONS):
+        pipeline_str = _random_pipeline(rng, names)
+        expected = _outcome(_parse_reference, executor, pipeline_str)
+        actual = _outcome(
+            lambda s: [
+                (command.name, repr(command.args))
+                for command in executor.parse_processor(s)
+            ],
+            pipeline_str,
+        )
+        assert actual == expected, pipeline_str
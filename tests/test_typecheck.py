@@ -0,0 +1,39 @@
+import sys
+import typing
+
+import pytest
+
+from amake.processor import ProcessorTypeError
+from amake.processors import create_processor_executor
+from amake.typecheck import resolve_annotation
+
+
+def test_resolve_typing_union():
+    assert resolve_annotation(typing.Union[str, list]) == (str, list)
+    assert resolve_annotation(typing.Optional[str]) == (str, type(None))
+    assert resolve_annotation(typing.Union[str, typing.Any]) is None
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="PEP 604 requires 3.10+")
+def test_resolve_pep604_union():
+    assert resolve_annotation(str | list) == (str, list)
+    assert resolve_annotation(str | None) == (str, type(None))
+
+
+def test_resolve_generic_and_unknown_forms():
+    assert resolve_annotation(typing.List[str]) == (list,)
+    assert resolve_annotation(typing.Literal["a"]) is None
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="PEP 604 requires 3.10+")
+def test_check_pipeline_accepts_pep604_custom_processor():
+    def myproc(input_data: str | list) -> str | list:
+        return input_data
+
+    executor = create_processor_executor()
+    executor.register(myproc, name="myproc")
+    executor.check_pipeline("myproc", str)
+    executor.check_pipeline("myproc", list)
+    executor.check_pipeline("strip|myproc|upper", str)
+    with pytest.raises(ProcessorTypeError):
+        executor.check_pipeline("myproc", int)